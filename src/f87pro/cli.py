@@ -6,6 +6,15 @@ import threading
 from .device import AulaF87Pro
 from .colors import parse_color_input, predefined_colors
 from .pywal import load_wal_colors, WalFileWatcher
+from .layout import LAYOUT, parse_key_spec
+from .profile import load_profile_packet
+from .recording import FrameRecorder
+from .effects import available_effects, create_effect
+from .effects.base import parse_effect_options
+from .gradient import MODES as GRADIENT_MODES, compile_gradient
+from .palette import IndexedFrame, Palette
+from .overlay import OverlayServer, get_overlay_socket_path, send_alert
+from .schedule import ScheduleRunner, load_schedule
 
 def create_parser():
     parser = argparse.ArgumentParser(
@@ -17,6 +26,21 @@ Examples:
   aula-f87pro --color "#FF0000"
   aula-f87pro --color "255,0,0"
   aula-f87pro --breathing blue --duration 30
+  aula-f87pro --keys wasd=red,arrows=blue
+  aula-f87pro --color white --keys fn-row=#FF6600
+  aula-f87pro --profile ~/scenes/coding.toml
+  aula-f87pro --schedule ~/scenes/day.toml --duration 0
+  aula-f87pro --gradient red:blue --gradient-angle 45
+  aula-f87pro --gradient pywal --gradient-mode radial --breathing
+  aula-f87pro --pywal gradient --breathing --duration 60 --record breath.f87
+  aula-f87pro --play breath.f87 --duration 0
+  aula-f87pro --effect rainbow --effect-opt speed=0.5
+  aula-f87pro --effect ripple --color cyan --effect-opt key=space
+  aula-f87pro --effect rainbow --isolate
+  aula-f87pro --simulate --breathing red --duration 600
+  aula-f87pro --simulate --realtime --preview terminal --effect rainbow
+  aula-f87pro --soak 24 --effect ripple
+  aula-f87pro --alert red --alert-keys fn-row --alert-blink 2 --alert-ttl 10
   aula-f87pro --pywal              # accent color from pywal
   aula-f87pro --pywal gradient     # gradient with pywal colors
   aula-f87pro --test
@@ -36,11 +60,33 @@ Examples:
     # Color commands
     parser.add_argument('--color', type=str,
                         help='Set solid color (hex: #FF0000, RGB: 255,0,0, or name: red)')
+    parser.add_argument('--keys', type=str, metavar='SPEC',
+                        help='Per-key colors as group=color pairs, e.g. wasd=red,arrows=blue (--color sets the base)')
+    parser.add_argument('--profile', type=str, metavar='FILE',
+                        help='Apply a static lighting profile (JSON or TOML), compiled once and cached')
+    parser.add_argument('--schedule', type=str, metavar='FILE',
+                        help='Run a playlist or time-of-day schedule (JSON or TOML) for --duration seconds (0 = forever)')
+    parser.add_argument('--gradient', type=str, metavar='STOPS',
+                        help="Gradient through colors separated by ':' (e.g. red:#00ff00:blue), or 'pywal'")
+    parser.add_argument('--gradient-angle', type=float, default=0.0, metavar='DEGREES',
+                        help='Direction of a linear gradient: 0 = left to right, 90 = top to bottom')
+    parser.add_argument('--gradient-mode', choices=GRADIENT_MODES, default='linear',
+                        help='Gradient shape (default: linear)')
     parser.add_argument('--breathing', nargs='?', const='__pywal__', default=None,
                         help='Breathing effect with color (same formats as --color). Color optional if --pywal is used.')
     parser.add_argument('--duration', type=float, default=10.0,
                         help='Duration for breathing effect in seconds (default: 10)')
     
+    # Effects from the effect registry (built-in and plugins)
+    parser.add_argument('--effect', type=str, metavar='NAME',
+                        help='Run a registered effect (see --list-effects); uses --color or --pywal colors')
+    parser.add_argument('--effect-opt', action='append', default=[], metavar='KEY=VALUE',
+                        help='Option passed to the effect, e.g. speed=2 (repeatable)')
+    parser.add_argument('--isolate', action='store_true',
+                        help='Render the --effect in a separate worker process (for CPU-heavy effects)')
+    parser.add_argument('--list-effects', action='store_true',
+                        help='List available effects')
+
     # Pywal integration
     parser.add_argument('--pywal', nargs='?', const='solid', default=None,
                         choices=['solid', 'gradient'],
@@ -48,6 +94,53 @@ Examples:
     parser.add_argument('--watch', action='store_true',
                         help='Watch for changes in pywal colors and update automatically')
 
+    # Recording and playback
+    parser.add_argument('--record', type=str, metavar='FILE',
+                        help='Record the frames of the selected effect to FILE')
+    parser.add_argument('--record-format', choices=['delta', 'indexed', 'raw'], default='delta',
+                        help='Store recorded frames as deltas against the previous frame (default), '
+                             'as palette-indexed deltas (smaller for effects with few distinct colors), or raw')
+    parser.add_argument('--play', type=str, metavar='FILE',
+                        help='Play back a recording, looping for --duration seconds (0 = forever)')
+
+    # Headless simulation
+    parser.add_argument('--simulate', action='store_true',
+                        help='Run without a keyboard, on a virtual clock (effects finish instantly)')
+    parser.add_argument('--realtime', action='store_true',
+                        help='With --simulate, run on the real clock instead of virtual time')
+    parser.add_argument('--preview', choices=['terminal', 'png'],
+                        help='With --simulate, draw frames in the terminal or as PNG files')
+    parser.add_argument('--preview-dir', type=str, default='preview', metavar='DIR',
+                        help='Directory for --preview png frames (default: ./preview)')
+    parser.add_argument('--preview-every', type=int, default=1, metavar='N',
+                        help='Only draw every Nth frame in the preview')
+
+    # Notification overlays, sent to the instance that is already running
+    parser.add_argument('--alert', type=str, metavar='COLOR',
+                        help='Flash COLOR over the running effect (see --alert-keys/-ttl/-priority/-blink)')
+    parser.add_argument('--alert-keys', type=str, default='all', metavar='KEYS',
+                        help="Keys or groups the alert covers, joined with '+' (default: all)")
+    parser.add_argument('--alert-ttl', type=float, default=5.0, metavar='SECONDS',
+                        help='How long the alert stays up (default: 5)')
+    parser.add_argument('--alert-priority', type=int, default=0, metavar='N',
+                        help='Higher priority alerts cover lower ones on shared keys (default: 0)')
+    parser.add_argument('--alert-blink', type=float, default=0.0, metavar='HZ',
+                        help='Blink the alert at HZ instead of showing it steadily')
+    parser.add_argument('--alert-name', type=str, metavar='NAME',
+                        help='Name the alert; a new alert with the same name replaces it')
+    parser.add_argument('--alert-clear', nargs='?', const='*', metavar='NAME',
+                        help='Remove the alert called NAME, or all alerts')
+
+    # Soak testing
+    parser.add_argument('--soak', type=float, metavar='HOURS',
+                        help='Soak-test the --effect (or --breathing color) for HOURS of virtual time on the simulator')
+    parser.add_argument('--soak-alloc-budget', type=float, default=1.0, metavar='BYTES',
+                        help='Max retained memory growth per frame during --soak (default: 1.0)')
+    parser.add_argument('--soak-rss-budget', type=float, default=8.0, metavar='MIB',
+                        help='Max RSS growth during --soak (default: 8 MiB)')
+    parser.add_argument('--soak-cpu-budget', type=float, default=None, metavar='MS',
+                        help='Max CPU time per frame during --soak (default: no limit)')
+
     # Utility commands
     parser.add_argument('--test', action='store_true',
                         help='Run RGB test sequence')
@@ -55,13 +148,86 @@ Examples:
                         help='Turn off all lighting')
     parser.add_argument('--list-colors', action='store_true',
                         help='List available predefined colors')
+    parser.add_argument('--list-keys', action='store_true',
+                        help='List key groups usable with --keys')
     
     return parser
 
+def run_alert_command(args) -> int:
+    """Hand --alert/--alert-clear to the running instance over its socket."""
+    if args.alert_clear:
+        request = {'clear': args.alert_clear}
+    else:
+        request = {'color': args.alert, 'keys': args.alert_keys, 'ttl': args.alert_ttl,
+                   'priority': args.alert_priority, 'blink': args.alert_blink}
+        if args.alert_name:
+            request['name'] = args.alert_name
+    try:
+        reply = send_alert(request)
+    except OSError as e:
+        print(f"No running aula-f87pro instance to alert ({get_overlay_socket_path()}): {e}")
+        return 1
+    if reply != 'ok':
+        print(f"Alert rejected: {reply}")
+        return 1
+    return 0
+
+def gradient_frame(args, colors=None) -> bytes:
+    """Compile the --gradient options into an RGB frame (memoized by compile_gradient)."""
+    if args.gradient == 'pywal':
+        if not colors or len(colors) < 7:
+            raise ValueError("Not enough pywal colors for a gradient")
+        stops = colors[1:7]
+    else:
+        stops = [parse_color_input(c) for c in args.gradient.split(':')]
+    return compile_gradient(stops, args.gradient_angle, args.gradient_mode)
+
+def create_simulated_keyboard(args):
+    from .clock import SYSTEM_CLOCK
+    from .simulator import SimulatedKeyboard, TerminalRenderer, PNGRenderer
+
+    renderers = []
+    if args.preview == 'terminal':
+        renderers.append(TerminalRenderer(every=args.preview_every))
+    elif args.preview == 'png':
+        renderers.append(PNGRenderer(args.preview_dir, every=args.preview_every))
+    return SimulatedKeyboard(clock=SYSTEM_CLOCK if args.realtime else None, renderers=renderers)
+
+def run_soak_command(args, effect_options) -> int:
+    from .soak import SoakBudget, run_soak, print_soak_report
+
+    try:
+        color = parse_color_input(args.color) if args.color else None
+        if args.effect:
+            effect = create_effect(args.effect, color=color, options=effect_options)
+        elif args.breathing and args.breathing != '__pywal__':
+            effect = create_effect('breathing', color=parse_color_input(args.breathing))
+        else:
+            print("Error: --soak needs --effect NAME or --breathing COLOR.")
+            return 1
+    except (ImportError, ValueError) as e:
+        print(f"Error loading effect: {e}")
+        return 1
+
+    budget = SoakBudget(alloc_per_frame=args.soak_alloc_budget,
+                        rss_growth=int(args.soak_rss_budget * 1024 * 1024),
+                        cpu_per_frame=args.soak_cpu_budget / 1000 if args.soak_cpu_budget is not None else None)
+    print(f"Soak testing {effect.name or type(effect).__name__} for {args.soak:g} virtual hours...")
+    try:
+        result = run_soak(effect, args.soak, budget)
+    finally:
+        effect.close()
+    print_soak_report(result)
+    return 0 if result.passed else 1
+
 def main():
     parser = create_parser()
     args = parser.parse_args()
-    keyboard = AulaF87Pro()
+    if args.simulate:
+        keyboard = create_simulated_keyboard(args)
+        simulation_start = keyboard.clock.monotonic()
+    else:
+        keyboard = AulaF87Pro()
     
     if args.list_colors:
         print("Available predefined colors:")
@@ -69,8 +235,44 @@ def main():
         for name, rgb in colors.items():
             print(f"  {name:<10} RGB{rgb}")
         return 0
+
+    if args.list_keys:
+        print("Available key groups:")
+        for name in LAYOUT.groups:
+            print(f"  {name:<10} {len(LAYOUT.group(name))} keys")
+        print("Single keys can be named too (e.g. space, f5, q) and joined with '+'.")
+        return 0
     
-    
+    if args.list_effects:
+        print("Available effects:")
+        for name, info in sorted(available_effects().items()):
+            print(f"  {name:<12} {info.summary or info.source}")
+        return 0
+
+    if args.effect:
+        if args.effect not in available_effects():
+            print(f"Unknown effect: {args.effect}. Use --list-effects to see available effects.")
+            return 1
+        try:
+            effect_options = parse_effect_options(args.effect_opt)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 1
+
+    schedule = None
+    if args.schedule:
+        try:
+            schedule = load_schedule(args.schedule)
+        except (OSError, ValueError, ImportError) as e:
+            print(f"Error loading schedule: {e}")
+            return 1
+
+    if args.alert or args.alert_clear:
+        return run_alert_command(args)
+
+    if args.soak:
+        return run_soak_command(args, effect_options if args.effect else {})
+
     if args.show_config:
         keyboard.config_manager.show_config()
         return 0
@@ -90,7 +292,30 @@ def main():
         print("\nYou need to run with Sudo or setup udev rules\n")
         print("Try running with --find-interface first to identify the working interface.")
         return 1
+
+    # Pause and reconnect automatically if the keyboard is unplugged mid-run
+    keyboard.enable_hotplug()
     
+    if args.record:
+        try:
+            keyboard.recorder = FrameRecorder(args.record, delta=(args.record_format != 'raw'),
+                                              indexed=(args.record_format == 'indexed'))
+        except OSError as e:
+            print(f"Error opening recording file: {e}")
+            keyboard.disconnect()
+            return 1
+        print(f"Recording frames to {args.record}")
+
+    # Accept --alert requests from other invocations while running
+    alert_server = None
+    if not (args.off or args.test):
+        alert_server = OverlayServer(keyboard.overlays)
+        try:
+            alert_server.start()
+        except OSError as e:
+            print(f"Alerts disabled: {e}")
+            alert_server = None
+
     try:
         if args.off:
             print("Turning off all lighting...")
@@ -104,7 +329,47 @@ def main():
             keyboard.test_sequence()
             print("Test sequence completed.")
         
-        elif args.color:
+        elif args.play:
+            try:
+                keyboard.play_recording(args.play, args.duration)
+            except (OSError, ValueError) as e:
+                print(f"Error playing recording: {e}")
+                return 1
+
+        elif schedule:
+            print(f"Running schedule: {args.schedule}")
+            try:
+                ok = ScheduleRunner(keyboard, schedule).run(args.duration)
+            except (OSError, ValueError, ImportError) as e:
+                print(f"Error starting scheduled scene: {e}")
+                return 1
+            if not ok:
+                print("Schedule stopped: keyboard not responding.")
+                return 1
+
+        elif args.profile:
+            try:
+                packet = load_profile_packet(args.profile)
+            except (OSError, ValueError, ImportError) as e:
+                print(f"Error loading profile: {e}")
+                return 1
+            print(f"Applying profile: {args.profile}")
+            if not keyboard.show_packet(packet, args.duration, name="Profile"):
+                print("Failed to apply profile.")
+                return 1
+
+        elif args.keys:
+            try:
+                assignments = parse_key_spec(args.keys)
+                base = parse_color_input(args.color) if args.color else None
+            except ValueError as e:
+                print(f"Error parsing keys: {e}")
+                return 1
+            if not keyboard.set_key_colors(assignments, base, args.duration):
+                print("Failed to set key colors.")
+                return 1
+
+        elif args.color and not args.effect:
             try:
                 r, g, b = parse_color_input(args.color)
                 print(f"Setting solid color: RGB({r}, {g}, {b})")
@@ -117,7 +382,7 @@ def main():
                 print(f"Error parsing color: {e}")
                 return 1
         
-        elif args.breathing or args.pywal:
+        elif args.breathing or args.pywal or args.effect or args.gradient:
             # State for watch mode - uses threading.Event for signaling
             change_event = threading.Event()
             stop_flag = threading.Event()
@@ -134,17 +399,37 @@ def main():
                 watcher.start()
                 print("Watching for pywal changes using inotify...")
             
+            # What is running on pywal colors and can be re-themed in place: an
+            # Effect with an IndexedFrame base, or a static IndexedFrame
+            themed = None
+
+            def retheme() -> bool:
+                colors = load_wal_colors()
+                if not colors or themed is None:
+                    return False
+                palette = Palette(colors[:256])
+                if isinstance(themed, IndexedFrame):
+                    themed.palette = palette
+                    keyboard.resend()  # through the frame loop, so overlays and --record see it
+                elif not themed.retheme(palette):
+                    return False
+                print("Applied new pywal palette.")
+                return True
+
             # Callback for effects to check if they should stop
             def should_stop_check():
+                if change_event.is_set() and themed is not None and retheme():
+                    change_event.clear()
                 return change_event.is_set() or stop_flag.is_set()
 
             try:
                 while True:
                     change_event.clear()
+                    themed = None
                     
                     # Load colors if potentially needed
                     colors = None
-                    if args.pywal or (args.breathing == '__pywal__'):
+                    if args.pywal or (args.breathing == '__pywal__' and not args.gradient) or args.gradient == 'pywal':
                         colors = load_wal_colors()
                         if not colors and args.watch:
                             # If file disappears or is empty, wait and retry
@@ -154,33 +439,91 @@ def main():
                             print("Error: Could not load pywal colors.")
                             return 1
 
+                    gradient_data = None
+                    if args.gradient:
+                        try:
+                            gradient_data = gradient_frame(args, colors)
+                        except ValueError as e:
+                            print(f"Error building gradient: {e}")
+                            return 1
+
+                    # --- Registry Effects ---
+                    if args.effect:
+                        color, base_data = None, None
+                        if args.color:
+                            try:
+                                color = parse_color_input(args.color)
+                            except ValueError as e:
+                                print(f"Error parsing color: {e}")
+                                return 1
+                        elif colors:
+                            color = colors[1] if len(colors) > 1 else colors[0]
+                            base_data = keyboard.create_theme_frame(colors, gradient=(args.pywal == 'gradient'))
+                        base_data = gradient_data or base_data
+                        try:
+                            if args.isolate:
+                                from .isolation import IsolatedEffect
+                                effect = IsolatedEffect(args.effect, color=color, base=base_data, options=effect_options)
+                            else:
+                                effect = create_effect(args.effect, color=color, base=base_data, options=effect_options)
+                        except (ImportError, ValueError) as e:
+                            print(f"Error loading effect {args.effect}: {e}")
+                            return 1
+                        if isinstance(base_data, IndexedFrame):
+                            themed = effect
+                        print(f"Starting {'watched ' if args.watch else ''}{'isolated ' if args.isolate else ''}{args.effect} effect...")
+                        try:
+                            keyboard.run_effect(effect, args.duration if not args.watch else 0, should_stop=should_stop_check)
+                        finally:
+                            effect.close()
+
                     # --- Breathing Logic ---
-                    if args.breathing:
+                    elif args.breathing:
                         r, g, b = 0, 0, 0
                         base_data = None
-                        if args.breathing == '__pywal__':
-                            if args.pywal == 'gradient':
-                                base_data = keyboard.create_gradient_data(colors)
-                            else:
-                                if len(colors) > 1: r, g, b = colors[1]
-                                elif len(colors) > 0: r, g, b = colors[0]
-                        else:
+                        theme = None
+                        if args.breathing == '__pywal__' and colors and not gradient_data:
+                            theme = keyboard.create_theme_frame(colors, gradient=(args.pywal == 'gradient'))
+                        if theme:
+                            # Pywal colors as palette indices, so --watch can swap the palette
+                            themed = create_effect('breathing', layout=keyboard.layout, base=theme)
+                        elif args.breathing == '__pywal__' and colors:
+                            r, g, b = colors[1] if len(colors) > 1 else colors[0]
+                        elif args.breathing != '__pywal__':
                             try:
                                 r, g, b = parse_color_input(args.breathing)
                             except: pass 
+                        base_data = gradient_data or base_data
 
-                        if base_data:
+                        if themed:
+                            print(f"Starting {'watched ' if args.watch else ''}pywal breathing effect...")
+                            try:
+                                keyboard.run_effect(themed, args.duration if not args.watch else 0, should_stop=should_stop_check)
+                            finally:
+                                themed.close()
+                        elif base_data:
                             print(f"Starting {'watched ' if args.watch else ''}breathing effect (Gradient)...")
                             keyboard.breathing_effect(0, 0, 0, args.duration if not args.watch else 0, base_rgb_data=base_data, should_stop=should_stop_check)
                         else:
                             print(f"Starting {'watched ' if args.watch else ''}breathing effect RGB({r},{g},{b})...")
                             keyboard.breathing_effect(r, g, b, args.duration if not args.watch else 0, should_stop=should_stop_check)
 
+                    # --- Static Gradient ---
+                    elif args.gradient:
+                        print(f"Starting {'watched ' if args.watch else ''}{args.gradient_mode} gradient...")
+                        keyboard.show_frame(gradient_data, args.duration if not args.watch else 0,
+                                            should_stop=should_stop_check, name="Gradient")
+
                     # --- Static Pywal Logic (if not breathing) ---
                     elif args.pywal:
+                        themed = keyboard.create_theme_frame(colors, gradient=(args.pywal == 'gradient'))
                         if args.pywal == 'gradient':
+                            if not themed:
+                                print("Error: Not enough pywal colors for gradient")
+                                return 1
                             print(f"Starting {'watched ' if args.watch else ''}pywal gradient...")
-                            keyboard.set_pywal_gradient(colors, args.duration if not args.watch else 0, should_stop=should_stop_check)
+                            keyboard.show_frame(themed, args.duration if not args.watch else 0,
+                                                should_stop=should_stop_check, name="Gradient")
                         else:
                             # Solid accent
                             if len(colors) > 1: r, g, b = colors[1]
@@ -188,7 +531,11 @@ def main():
                             else: r,g,b = 255,255,255
                             
                             print(f"Starting {'watched ' if args.watch else ''}pywal solid RGB({r},{g},{b})...")
-                            keyboard.set_solid_color(r, g, b, args.duration if not args.watch else 0, should_stop=should_stop_check)
+                            if themed:
+                                keyboard.show_frame(themed, args.duration if not args.watch else 0,
+                                                    should_stop=should_stop_check, name="Solid color")
+                            else:
+                                keyboard.set_solid_color(r, g, b, args.duration if not args.watch else 0, should_stop=should_stop_check)
                     
                     # If not watching, or we stopped for a reason other than file change, exit
                     if not args.watch or not change_event.is_set():
@@ -208,6 +555,14 @@ def main():
         print(f"Unexpected error: {e}")
         return 1
     finally:
+        if args.simulate:
+            print(f"Simulation sent {keyboard.hid.reports} reports "
+                  f"over {keyboard.clock.monotonic() - simulation_start:.1f}s of {'real' if args.realtime else 'virtual'} time.")
+        if alert_server:
+            alert_server.stop()
+        if keyboard.recorder:
+            keyboard.recorder.close()
+            print(f"Recorded {keyboard.recorder.frame_count} frames to {args.record}")
         keyboard.disconnect()
     
     return 0
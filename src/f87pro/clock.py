@@ -0,0 +1,45 @@
+import time
+from typing import Optional
+
+
+class SystemClock:
+    """Real time: wall clock, monotonic clock and sleeping."""
+
+    __slots__ = ()
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+
+SYSTEM_CLOCK = SystemClock()
+
+
+class VirtualClock:
+    """
+    Simulated time that only moves when something sleeps or calls advance().
+    Lets effects with long durations run as fast as they can render.
+    """
+
+    __slots__ = ('_now', '_wall_start')
+
+    def __init__(self, start: float = 0.0, wall_start: Optional[float] = None):
+        self._now = start
+        self._wall_start = time.time() if wall_start is None else wall_start
+
+    def time(self) -> float:
+        return self._wall_start + self._now
+
+    def monotonic(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            self._now += seconds
+
+    advance = sleep
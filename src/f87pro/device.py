@@ -1,122 +1,121 @@
 import hidraw as hid
 import time
 import os
+import threading
 from typing import Optional
+from .clock import SYSTEM_CLOCK
 from .config import ConfigManager
+from .hotplug import HotplugMonitor
+from .layout import LAYOUT, KEY_NAMES, build_key_frame
+from .overlay import OverlayManager
+from .palette import IndexedFrame, Palette
+from .probe import probe_all, probe_first
+from .recording import FramePlayer
+from .scheduler import FrameScheduler
+
+# hidapi's hidraw module reports write errors as OSError; other builds have HIDException
+HID_ERROR = getattr(hid, 'HIDException', OSError)
+
+PACKET_HEADER = bytes([0x06, 0x08, 0x00, 0x00, 0x01, 0x00, 0x7A, 0x01])
+PACKET_SIZE = 520
+
+
+def build_packet(rgb_data, num_leds: int = LAYOUT.num_leds) -> bytes:
+    """
+    Build the 520-byte RGB feature report, padding or truncating rgb_data to num_leds.
+    rgb_data may also be an IndexedFrame.
+    """
+    expected_len = num_leds * 3
+    if isinstance(rgb_data, IndexedFrame):
+        packet = bytearray(PACKET_SIZE)
+        packet[:len(PACKET_HEADER)] = PACKET_HEADER
+        rgb_data.palette.expand_into(rgb_data.indices[:num_leds], packet, len(PACKET_HEADER))
+        return bytes(packet)
+    rgb = bytes(rgb_data[:expected_len])
+    return PACKET_HEADER + rgb + bytes(PACKET_SIZE - len(PACKET_HEADER) - len(rgb))
+
 
 class AulaF87Pro:
     VENDOR_ID = 0x258a
     PRODUCT_ID = 0x010c
 
-    # LED indices for each key - organized by physical layout
-    KEY_INDICES = [
-        0,   12,18,24,30,36,42,48,54,60,66,72,78,84,90,96,   
-        1, 7,13,19,25,31,37,43,49,55,61,67,73,79,85,91,97,
-        2, 8,14,20,26,32,38,44,50,56,62,68,74,80,86,92,98,
-        3, 9,15,21,27,33,39,45,51,57,63,69,   81,  
-        4,10,16,22,28,34,40,46,52,58,64,      82,   94,
-        5,11,17,      35,      53,59,65,      83,89,95,101
-    ]
-    
-    # Physical key positions for ripple effect calculations (row, col)
-    KEY_POSITIONS = {
-        # Function row
-        0: (0, 0), 12: (0, 1), 18: (0, 2), 24: (0, 3), 30: (0, 4), 36: (0, 5),
-        42: (0, 6), 48: (0, 7), 54: (0, 8), 60: (0, 9), 66: (0, 10), 72: (0, 11),
-        78: (0, 12), 84: (0, 13), 90: (0, 14), 96: (0, 15),
-        
-        # Number row
-        1: (1, 0), 7: (1, 1), 13: (1, 2), 19: (1, 3), 25: (1, 4), 31: (1, 5),
-        37: (1, 6), 43: (1, 7), 49: (1, 8), 55: (1, 9), 61: (1, 10), 67: (1, 11),
-        73: (1, 12), 79: (1, 13), 85: (1, 14), 91: (1, 15), 97: (1, 16),
-        
-        # Tab row
-        2: (2, 0), 8: (2, 1), 14: (2, 2), 20: (2, 3), 26: (2, 4), 32: (2, 5),
-        38: (2, 6), 44: (2, 7), 50: (2, 8), 56: (2, 9), 62: (2, 10), 68: (2, 11),
-        74: (2, 12), 80: (2, 13), 86: (2, 14), 92: (2, 15), 98: (2, 16),
-        
-        # Caps row
-        3: (3, 0), 9: (3, 1), 15: (3, 2), 21: (3, 3), 27: (3, 4), 33: (3, 5),
-        39: (3, 6), 45: (3, 7), 51: (3, 8), 57: (3, 9), 63: (3, 10), 69: (3, 11),
-        81: (3, 12),
-        
-        # Shift row
-        4: (4, 0), 10: (4, 1), 16: (4, 2), 22: (4, 3), 28: (4, 4), 34: (4, 5),
-        40: (4, 6), 46: (4, 7), 52: (4, 8), 58: (4, 9), 64: (4, 10), 82: (4, 11),
-        94: (4, 12),
-        
-        # Bottom row
-        5: (5, 0), 11: (5, 1), 17: (5, 2), 35: (5, 3), 53: (5, 4), 59: (5, 5),
-        65: (5, 6), 83: (5, 7), 89: (5, 8), 95: (5, 9), 101: (5, 10)
-    }
-
-    KEY_MAP = {
-        # Letters
-        'a': 9, 'b': 46, 'c': 34, 'd': 21, 'e': 20, 'f': 27, 'g': 33, 'h': 39,
-        'i': 56, 'j': 45, 'k': 51, 'l': 57, 'm': 52, 'n': 40, 'o': 62, 'p': 68,
-        'q': 8, 'r': 26, 's': 15, 't': 32, 'u': 50, 'v': 28, 'w': 14, 'x': 22,
-        'y': 44, 'z': 16,
-        
-        # Numbers
-        '1': 7, '2': 13, '3': 19, '4': 25, '5': 31, '6': 37, '7': 43, '8': 49,
-        '9': 55, '0': 61,
-        
-        # Function keys
-        'f1': 12, 'f2': 18, 'f3': 24, 'f4': 30, 'f5': 36, 'f6': 42, 'f7': 48,
-        'f8': 54, 'f9': 60, 'f10': 66, 'f11': 72, 'f12': 78,
-        
-        'space': 35, 'enter': 81, 'shift': 4, 'ctrl': 5, 'alt': 11, # 'shift_l', 'ctrl_l', 'alt_l' might be more specific
-        'tab': 2, 'caps_lock': 3, 'backspace': 85, 'escape': 0,
-        
-        # Punctuation
-        ';': 63, "'": 69, ',': 58, '.': 64, '/': 82, '\\': 92, '[': 74, ']': 80,
-        '=': 67, '-': 73, '`': 1
-    }
+    # Layout tables, kept for compatibility; f87pro.layout.LAYOUT is the source of truth
+    KEY_INDICES = list(LAYOUT.leds)
+    KEY_POSITIONS = {led: LAYOUT.position(led) for led in LAYOUT.leds}
+    KEY_MAP = dict(KEY_NAMES)
+
+    # Backoff between reconnect attempts after a failed write (seconds)
+    RECONNECT_MIN_DELAY = 0.05
+    RECONNECT_MAX_DELAY = 2.0
     
-    def __init__(self):
+    def __init__(self, clock=SYSTEM_CLOCK):
         self.device = None
         self.device_path = None
-        self.num_leds = 102
+        self.num_leds = LAYOUT.num_leds
+        self.layout = LAYOUT
+        self.recorder = None
+        self.overlays = OverlayManager(LAYOUT, clock)
+        self._packet = bytearray(build_packet(b'', self.num_leds))
+        self.clock = clock
+        self.auto_reconnect = True
+        self.hotplug_monitor = None
+        self._connected = False
+        self._lock = threading.RLock()
+        self._plugged = threading.Event()
+        self._plugged.set()
+        self._resend = threading.Event()
+        self._last_packet = None
+        self._retry_delay = 0.0
+        self._retry_at = 0.0
         self.config_manager = ConfigManager(os.path.expanduser("~/.aula_f87_config.json"))
     
+    @staticmethod
+    def _interface_label(dev_info) -> str:
+        path = dev_info['path'].decode('utf-8') if isinstance(dev_info['path'], bytes) else dev_info['path']
+        number = dev_info.get('interface_number')
+        return path if number is None else f"{path} (interface {number})"
+
+    @staticmethod
+    def _send_test_packet(dev_info, packet=None) -> bool:
+        """Open an interface, send packet (or just open it if None) and close it again."""
+        temp_device = hid.device()
+        temp_device.open_path(dev_info['path'])
+        try:
+            if packet is not None:
+                temp_device.send_feature_report(packet)
+        finally:
+            temp_device.close()
+        return True
+
     def auto_find_interface(self) -> Optional[str]:
-        """Automatically find RGB interface without user interaction."""
+        """
+        Automatically find RGB interface without user interaction.
+        Candidates are probed concurrently, each with a PROBE_TIMEOUT limit.
+        """
         devices = hid.enumerate(self.VENDOR_ID, self.PRODUCT_ID)
         if not devices:
             return None
 
-        # Prefer interface with usage_page 0xff00 (vendor-specific, usually RGB)
-        for dev_info in devices:
-            if dev_info.get('usage_page') == 0xff00:
-                try:
-                    temp_device = hid.device()
-                    temp_device.open_path(dev_info['path'])
-                    # Test with a simple packet
-                    packet = [0x06, 0x08, 0x00, 0x00, 0x01, 0x00, 0x7a, 0x01]
-                    packet.extend([0] * (520 - len(packet)))
-                    temp_device.send_feature_report(packet)
-                    temp_device.close()
-
-                    path = dev_info['path'].decode('utf-8') if isinstance(dev_info['path'], bytes) else dev_info['path']
-                    self.config_manager.set('device_path', path)
-                    self.config_manager.set('vendor_id', self.VENDOR_ID)
-                    self.config_manager.set('product_id', self.PRODUCT_ID)
-                    return path
-                except:
-                    continue
-
-        # Fallback: try interface 1
-        for dev_info in devices:
-            if dev_info.get('interface_number') == 1:
-                try:
-                    temp_device = hid.device()
-                    temp_device.open_path(dev_info['path'])
-                    temp_device.close()
-                    path = dev_info['path'].decode('utf-8') if isinstance(dev_info['path'], bytes) else dev_info['path']
-                    self.config_manager.set('device_path', path)
-                    return path
-                except:
-                    continue
+        print("Probing keyboard interfaces...")
+        # Prefer interface with usage_page 0xff00 (vendor-specific, usually RGB),
+        # tested with an all-off packet
+        packet = build_packet(b'', self.num_leds)
+        match = probe_first([d for d in devices if d.get('usage_page') == 0xff00],
+                            lambda d: self._send_test_packet(d, packet), label=self._interface_label)
+        if match:
+            path = match['path'].decode('utf-8') if isinstance(match['path'], bytes) else match['path']
+            self.config_manager.set('device_path', path)
+            self.config_manager.set('vendor_id', self.VENDOR_ID)
+            self.config_manager.set('product_id', self.PRODUCT_ID)
+            return path
+
+        # Fallback: interface 1, if it can be opened
+        match = probe_first([d for d in devices if d.get('interface_number') == 1],
+                            self._send_test_packet, label=self._interface_label)
+        if match:
+            path = match['path'].decode('utf-8') if isinstance(match['path'], bytes) else match['path']
+            self.config_manager.set('device_path', path)
+            return path
 
         return None
 
@@ -128,86 +127,65 @@ class AulaF87Pro:
             print("No Aula F87 Pro devices found.")
             return None
 
-        for i, dev_info in enumerate(devices):
-            if i == 0:  # Typically keyboard input interface
-                print(f"Skipping interface {i} (likely keyboard input).")
-                continue
+        # Interface 0 is typically keyboard input
+        print("Skipping interface 0 (likely keyboard input).")
+        candidates = list(enumerate(devices))[1:]
 
+        # Weed out interfaces that can't be opened (or hang) before asking about any
+        print(f"Checking {len(candidates)} interfaces...")
+        candidates = probe_all(candidates, lambda c: self._send_test_packet(c[1]),
+                               label=lambda c: self._interface_label(c[1]))
+
+        # Red data for first 10 LEDs, off for rest
+        packet = build_packet([255, 0, 0] * 10, self.num_leds)
+        clear_packet = build_packet(b'', self.num_leds)
+
+        for i, dev_info in candidates:
             print(f"\nTesting interface {i}...")
             print(f"  Path: {dev_info['path']}")
             print(f"  Interface: {dev_info.get('interface_number', 'N/A')}")
             print(f"  Usage Page: {hex(dev_info.get('usage_page', 0))}")
             print(f"  Usage: {hex(dev_info.get('usage', 0))}")
-            
-            try:
-                temp_device = hid.device()
-                temp_device.open_path(dev_info['path'])
-                
-                packet = [0x06, 0x08, 0x00, 0x00, 0x01, 0x00, 0x7a, 0x01]
-                
-                # Red data for first 10 LEDs, off for rest
-                test_data = [255, 0, 0] * 10 + [0, 0, 0] * (self.num_leds - 10)
-                packet.extend(test_data)
-                packet.extend([0] * (520 - len(packet)))
-                
-                print(f"  Sending test packet ({len(packet)} bytes)...")
-                
-                try:
-                    result = temp_device.send_feature_report(packet)
-                    print(f"  Feature report result: {result}")
-                    
-                    time.sleep(0.5)
-                    
-                    response = input(f"  Did you see red lights on interface {i}? (y/n): ").lower().strip()
-                    
-                    if response == 'y' or response == 'yes':
-                        print(f"Interface {i} works! Saving configuration...")
-                        
-                        clear_packet = packet.copy()
-                        clear_packet[8:8 + self.num_leds * 3] = [0] * (self.num_leds * 3)
-                        temp_device.send_feature_report(clear_packet)
-                        
-                        temp_device.close()
-                        
-                        self.config_manager.set('device_path', dev_info['path'].decode('utf-8') if isinstance(dev_info['path'], bytes) else dev_info['path'])
-                        self.config_manager.set('vendor_id', self.VENDOR_ID)
-                        self.config_manager.set('product_id', self.PRODUCT_ID)
-                        self.config_manager.set('saved_at', time.time())
-                        
-                        return dev_info['path']
-                    else:
-                        print(f"  Interface {i} doesn't control RGB lighting")
-                        
-                except Exception as e:
-                    print(f"  Feature report failed: {e}")
-                
-                temp_device.close()
-                
-            except Exception as e:
-                print(f"  Interface {i} failed to open: {e}")
-        
+            print(f"  Sending test packet ({len(packet)} bytes)...")
+
+            if not probe_first([dev_info], lambda d: self._send_test_packet(d, packet),
+                               label=self._interface_label):
+                print(f"  Feature report failed on interface {i}")
+                continue
+
+            time.sleep(0.5)
+
+            response = input(f"  Did you see red lights on interface {i}? (y/n): ").lower().strip()
+
+            if response == 'y' or response == 'yes':
+                print(f"Interface {i} works! Saving configuration...")
+                probe_first([dev_info], lambda d: self._send_test_packet(d, clear_packet),
+                            label=self._interface_label, log=lambda message: None)
+
+                self.config_manager.set('device_path', dev_info['path'].decode('utf-8') if isinstance(dev_info['path'], bytes) else dev_info['path'])
+                self.config_manager.set('vendor_id', self.VENDOR_ID)
+                self.config_manager.set('product_id', self.PRODUCT_ID)
+                self.config_manager.set('saved_at', time.time())
+
+                return dev_info['path']
+            else:
+                print(f"  Interface {i} doesn't control RGB lighting")
+
         print("No working interface found!")
         return None
 
     def verify_saved_interface(self, device_path: str) -> bool:
-        try:
-            print(f"Verifying saved interface: {device_path}")
-            device_path_bytes = device_path.encode('utf-8') if isinstance(device_path, str) else device_path
-            temp_device = hid.device()
-            temp_device.open_path(device_path_bytes)
-            
-            # Test packet
-            packet = [0x06, 0x08, 0x00, 0x00, 0x01, 0x00, 0x7a, 0x01]
-            packet.extend([0] * (self.num_leds * 3))
-            packet.extend([0] * (520 - len(packet)))
-            temp_device.send_feature_report(packet)
-            temp_device.close()
-            
+        print(f"Verifying saved interface: {device_path}")
+        device_path_bytes = device_path.encode('utf-8') if isinstance(device_path, str) else device_path
+        # Test packet, bounded by PROBE_TIMEOUT so a hung interface can't stall startup
+        dev_info = {'path': device_path_bytes}
+        packet = build_packet(b'', self.num_leds)
+        if probe_first([dev_info], lambda d: self._send_test_packet(d, packet),
+                       label=self._interface_label):
             print("Saved interface verified!")
             return True
-        except Exception as e:
-            print(f"Saved interface verification failed: {e}")
-            return False
+        print("Saved interface verification failed.")
+        return False
 
     def connect(self, force_find: bool = False) -> bool:
 
@@ -229,6 +207,7 @@ class AulaF87Pro:
             self.device = hid.device()
             device_path_bytes = self.device_path.encode('utf-8') if isinstance(self.device_path, str) else self.device_path
             self.device.open_path(device_path_bytes)
+            self._connected = True
             print(f"Connected to Aula F87 Pro on path: {self.device_path}")
             return True
         except Exception as e:
@@ -238,39 +217,138 @@ class AulaF87Pro:
             return False
         
     def disconnect(self):
+        if self.hotplug_monitor:
+            self.hotplug_monitor.stop()
+            self.hotplug_monitor = None
+        self._connected = False
         if self.device:
             print("Disconnecting from keyboard.")
             self.device.close()
             self.device = None
-            
-    
+
+    def enable_hotplug(self, event_source=None) -> bool:
+        """
+        Watch for the keyboard being unplugged and plugged back in. While it is
+        gone, frame loops pause; when it returns, the cached interface is reopened
+        and the current frame is sent again immediately.
+        """
+        if not self._connected or self.hotplug_monitor:
+            return False
+        path = self.device_path.decode('utf-8') if isinstance(self.device_path, bytes) else self.device_path
+        if event_source is None and not path.startswith('/dev/hidraw'):
+            return False
+        self.hotplug_monitor = HotplugMonitor(path, self._on_unplugged, self._on_replugged, event_source)
+        self.hotplug_monitor.start()
+        return True
+
+    def _on_unplugged(self):
+        with self._lock:
+            print("Keyboard unplugged. Pausing until it is reconnected...")
+            self._plugged.clear()
+            self._close_device()
+
+    def _on_replugged(self, path: str):
+        with self._lock:
+            self.device_path = path
+            # The node can show up a moment before udev has applied its permissions
+            for _ in range(10):
+                if self._reopen():
+                    self._retry_delay = 0.0  # a fresh node; failures start a new backoff
+                    print(f"Reconnected to Aula F87 Pro on path: {self.device_path}")
+                    break
+                time.sleep(0.02)
+            self._plugged.set()
+            if self.device and self._last_packet:
+                self.send_packet(self._last_packet)
+        if self.device:
+            self.config_manager.set('device_path', path)
+
+    def _close_device(self):
+        if self.device:
+            try:
+                self.device.close()
+            except Exception:
+                pass
+            self.device = None
+
+    def _reopen(self) -> bool:
+        """
+        Reopen the cached interface path without probing; schedules a retry on
+        failure. The backoff is only reset once a write succeeds, so a node that
+        opens but rejects every report is still retried at a growing interval.
+        """
+        try:
+            device = hid.device()
+            device_path_bytes = self.device_path.encode('utf-8') if isinstance(self.device_path, str) else self.device_path
+            device.open_path(device_path_bytes)
+        except Exception:
+            self._schedule_retry()
+            return False
+        self.device = device
+        return True
+
+    def _schedule_retry(self):
+        self._retry_delay = min(max(self._retry_delay * 2, self.RECONNECT_MIN_DELAY), self.RECONNECT_MAX_DELAY)
+        self._retry_at = self.clock.monotonic() + self._retry_delay
+
     def send_rgb(self, rgb_data: list) -> bool:
-        if not self.device:
+        if not self._connected:
             print("Error: Device not connected. Cannot send RGB data.")
             return False
-        
-        try:
-            packet = [0x06, 0x08, 0x00, 0x00, 0x01, 0x00, 0x7A, 0x01]
-            
-            expected_len = self.num_leds * 3
-            if len(rgb_data) != expected_len:
-                if len(rgb_data) < expected_len:
-                    rgb_data.extend([0] * (expected_len - len(rgb_data)))
-                else:
-                    rgb_data = rgb_data[:expected_len]
-                                   
-            packet.extend(rgb_data)
-            packet.extend([0] * (520 - len(packet)))
-
-            self.device.send_feature_report(packet)
-            return True
-        
-        except hid.HIDException as e:
-            print(f"HID Error: Failed to send RGB data packet: {e}")
+
+        # Fill the reused report buffer in place and send it as is, instead of
+        # building a new one per frame. This happens under the lock, so a replug
+        # resending the last report (which may be this buffer) never sees half a frame.
+        packet = self._packet
+        expected_len = self.num_leds * 3
+        start = len(PACKET_HEADER)
+        n = min(len(rgb_data), expected_len)
+        with self._lock:
+            if isinstance(rgb_data, IndexedFrame):
+                rgb_data.palette.expand_into(rgb_data.indices[:n // 3], packet, start)
+            else:
+                packet[start:start + n] = rgb_data if n == len(rgb_data) else rgb_data[:n]
+            if n < expected_len:
+                packet[start + n:start + expected_len] = bytes(expected_len - n)
+            return self.send_packet(packet)
+
+    def send_packet(self, packet: bytes) -> bool:
+        """
+        Send a complete, pre-built 520-byte report (see build_packet). The
+        report is kept by reference for resending after a replug, not copied.
+        After a failed write the device is closed and reopened with exponential
+        backoff; frames sent in between are dropped and return False.
+        """
+        if not self._connected:
+            print("Error: Device not connected. Cannot send RGB data.")
             return False
 
-        except Exception as e:
-            print(f"Error: Failed to send RGB data packet: {e}")
+        with self._lock:
+            self._last_packet = packet
+            if not self._plugged.is_set():
+                return False
+            if self.device is None:
+                if self.clock.monotonic() < self._retry_at or not self._reopen():
+                    return False
+
+            try:
+                self.device.send_feature_report(packet)
+            except HID_ERROR as e:
+                error = f"HID Error: Failed to send RGB data packet: {e}"
+            except Exception as e:
+                error = f"Error: Failed to send RGB data packet: {e}"
+            else:
+                if self._retry_delay:
+                    print(f"Reconnected to Aula F87 Pro on path: {self.device_path}")
+                    self._retry_delay = 0.0
+                return True
+
+            # Report only the first failure of a run; retries back off quietly
+            first_failure = not self._retry_delay
+            self._close_device()
+            self._schedule_retry()
+            if first_failure:
+                print(f"{error}. Reconnecting...")
             return False
 
     def turn_off(self) -> bool:
@@ -294,95 +372,148 @@ class AulaF87Pro:
             print("Device Error: Failed to set initial solid color.")
             return False
         
-        if duration == 0.0: 
-            try:
-                while True:
-                    if should_stop and should_stop():
-                        return True
-                    self.send_rgb(rgb_data_initial)
-                    # Check periodically (every 0.1s) to allow fast response, send keepalive every 1s
-                    for _ in range(10):
-                        if should_stop and should_stop():
-                            return True
-                        time.sleep(0.1)
-            except KeyboardInterrupt:
-                print("\nDevice: Solid color effect interrupted by user.")
-                self.turn_off()
-                raise 
-        else: #
-            try:
-                start_time = time.time()
-                current_elapsed_time = 0
-                
-
-                while current_elapsed_time < duration:
-                    current_elapsed_time = time.time() - start_time
-                    self.send_rgb(rgb_data_initial)
-                    time.sleep(1)
-                
+        try:
+            self.run_frames(lambda elapsed: rgb_data_initial, 1.0, duration, should_stop, stop_on_error=False)
+            if duration != 0.0:
                 print(f"Device: Solid color duration ({duration}s) ended.")
                 self.turn_off()
-            except KeyboardInterrupt:
-                print("\nDevice: Timed solid color effect interrupted by user.")
-                self.turn_off()
-                raise 
+        except KeyboardInterrupt:
+            print("\nDevice: Solid color effect interrupted by user.")
+            self.turn_off()
+            raise 
         return True
         
     
     def breathing_effect(self, r: int, g: int, b: int, duration: float = 0.0, base_rgb_data: list = None, should_stop=None):
-        
-        import math 
+        from .effects.breathing import BreathingEffect
+
         if base_rgb_data:
              print(f"Device: Breathing effect (Custom Pattern), duration: {'infinite' if duration == 0.0 else str(duration)+'s'}")
         else:
              print(f"Device: Breathing effect RGB({r},{g},{b}), duration: {'infinite' if duration == 0.0 else str(duration)+'s'}")
 
+        effect = BreathingEffect(layout=self.layout, color=(r, g, b), base=base_rgb_data)
+        start_time = self.clock.monotonic()
         try:
-            start_time = time.time()
-            while True:
-                if should_stop and should_stop():
-                    break
-                    
-                current_elapsed_time = time.time() - start_time
-                
-                if duration != 0.0 and current_elapsed_time >= duration:
-                    print(f"Device: Breathing effect duration ({duration}s) ended.")
-                    break 
-                
-                brightness_speed_factor = 1.5 
-                brightness = (math.sin(current_elapsed_time * brightness_speed_factor) + 1) / 2
-
-                frame_rgb_data = []
-                
-                if base_rgb_data:
-                    for i in range(0, len(base_rgb_data), 3):
-                        if i + 2 < len(base_rgb_data):
-                            br = base_rgb_data[i]
-                            bg = base_rgb_data[i+1]
-                            bb = base_rgb_data[i+2]
-                            frame_rgb_data.extend([int(br * brightness), int(bg * brightness), int(bb * brightness)])
-                        else:
-                             frame_rgb_data.extend([0, 0, 0])
-                else:
-                    current_r = int(r * brightness)
-                    current_g = int(g * brightness)
-                    current_b = int(b * brightness)
-                    for _ in range(self.num_leds):
-                        frame_rgb_data.extend([current_r, current_g, current_b])
-                
-                if not self.send_rgb(frame_rgb_data):
-                    print("Device Error: Failed to send frame for breathing effect. Stopping.")
-                    break 
-                
-                time.sleep(0.05) 
+            if not self.run_frames(effect.render, effect.fps, duration, should_stop):
+                print("Device Error: Failed to send frame for breathing effect. Stopping.")
+            elif duration != 0.0 and self.clock.monotonic() - start_time >= duration:
+                print(f"Device: Breathing effect duration ({duration}s) ended.")
 
         except KeyboardInterrupt:
             print("\nDevice: Breathing effect interrupted by user.")
             raise 
         finally:
-            if duration > 0.0 and (time.time() - start_time >= duration): # Check if it completed naturally
+            if duration > 0.0 and (self.clock.monotonic() - start_time >= duration): # Check if it completed naturally
                  self.turn_off()
 
+    def run_effect(self, effect, duration: float = 0.0, should_stop=None) -> bool:
+        """Run an Effect instance (see f87pro.effects) until duration or should_stop."""
+        print(f"Device: {effect.name or type(effect).__name__} effect, "
+              f"duration: {'infinite' if duration == 0.0 else str(duration)+'s'}")
+        start_time = self.clock.monotonic()
+        try:
+            if not self.run_frames(effect.render, effect.fps, duration, should_stop):
+                print("Device Error: Failed to send effect frame. Stopping.")
+                return False
+            return True
+        except KeyboardInterrupt:
+            print("\nDevice: Effect interrupted by user.")
+            raise
+        finally:
+            if duration > 0.0 and (self.clock.monotonic() - start_time >= duration):
+                self.turn_off()
+
+    def play_recording(self, path: str, duration: float = 0.0, should_stop=None) -> bool:
+        """Stream a recording made with --record, looping at its recorded frame rate."""
+        player = FramePlayer(path)
+        print(f"Device: Playing {path} ({player.frame_count} frames at {player.fps:g} fps), "
+              f"duration: {'infinite' if duration == 0.0 else str(duration)+'s'}")
+        start_time = self.clock.monotonic()
+        try:
+            return self.run_frames(lambda elapsed: player.next_frame(), player.fps, duration, should_stop)
+        except KeyboardInterrupt:
+            print("\nDevice: Playback interrupted by user.")
+            raise
+        finally:
+            player.close()
+            if duration > 0.0 and (self.clock.monotonic() - start_time >= duration):
+                self.turn_off()
+
+    def run_frames(self, render, fps: float, duration: float = 0.0, should_stop=None,
+                   send=None, stop_on_error: Optional[bool] = None) -> bool:
+        """
+        Run render(elapsed) on the shared frame scheduler and send each frame
+        (send_rgb by default), copying frames to self.recorder when recording
+        (resampled to the recording's frame rate, the first loop's by default).
+        Active overlays are drawn over the frames on the way out (they are not
+        recorded). Failed sends stop the loop only if stop_on_error (default:
+        not auto_reconnect). See resend() for frames changed in place.
+        """
+        send = send or self.send_rgb
+        if stop_on_error is None:
+            stop_on_error = not self.auto_reconnect
+        scheduler = FrameScheduler(fps, self.clock.monotonic, self.clock.sleep)
+        overlays = self.overlays
+        offset = len(PACKET_HEADER) if send == self.send_packet else 0
+
+        def render_when_plugged(elapsed):
+            # Don't render while the keyboard is unplugged
+            while not self._plugged.is_set() and not (should_stop and should_stop()):
+                self._plugged.wait(0.1)
+            return render(elapsed)
+
+        def send_with_overlays(frame):
+            overlays.capture(frame, offset)
+            composed = overlays.compose(self.clock.monotonic())
+            return send(frame) if composed is None else self.send_rgb(composed)
+
+        recorder = self.recorder
+        deliver = send_with_overlays
+        if recorder:
+            if recorder.fps is None:
+                recorder.fps = fps
+
+            def deliver(frame):
+                recorder.add_at(frame if send != self.send_packet else frame[8:8 + recorder.frame_size],
+                                self.clock.monotonic())
+                return send_with_overlays(frame)
+
+        last_frame = None
+
+        def send_frame(frame):
+            nonlocal last_frame
+            last_frame = frame
+            return deliver(frame)
+
+        def check_overlays():
+            # Called whenever the scheduler wakes, so new and expired overlays
+            # show up within a frame; the cached frame is restored without re-rendering
+            stop = bool(should_stop and should_stop())
+            if stop:
+                return True
+            if self._resend.is_set():
+                self._resend.clear()
+                if last_frame is not None:
+                    deliver(last_frame)
+                    return False
+            now = self.clock.monotonic()
+            if overlays.refresh_due(now):
+                composed = overlays.compose(now)
+                self.send_rgb(overlays.base if composed is None else composed)
+            return False
+
+        self._resend.clear()
+        return scheduler.run(render_when_plugged, send_frame, duration, check_overlays, stop_on_error)
+
+    def resend(self):
+        """
+        Have the running frame loop send its last frame again, through the
+        overlay and recorder path, when that frame was changed in place (e.g. a
+        new palette on an IndexedFrame). Takes effect the next time the loop wakes.
+        """
+        self._resend.set()
+
 
     def test_sequence(self):
         print("Device: Running RGB test sequence...")
@@ -401,7 +532,7 @@ class AulaF87Pro:
                 print(f"Device Test: Failed to set {name}")
                 self.turn_off()
                 return
-            time.sleep(1) 
+            self.clock.sleep(1) 
         
         print("Device Test: Turning lights off.")
         self.turn_off()
@@ -422,26 +553,25 @@ class AulaF87Pro:
         if not colors or len(colors) < 6:
              return None
         
-        row_colors = [colors[i] for i in range(1, 7)]
-        rows = [
-            [0, 12, 18, 24, 30, 36, 42, 48, 54, 60, 66, 72, 78, 84, 90, 96],
-            [1, 7, 13, 19, 25, 31, 37, 43, 49, 55, 61, 67, 73, 79, 85, 91, 97],
-            [2, 8, 14, 20, 26, 32, 38, 44, 50, 56, 62, 68, 74, 80, 86, 92, 98],
-            [3, 9, 15, 21, 27, 33, 39, 45, 51, 57, 63, 69, 81],
-            [4, 10, 16, 22, 28, 34, 40, 46, 52, 58, 64, 82, 94],
-            [5, 11, 17, 35, 53, 59, 65, 83, 89, 95, 101],
-        ]
-        
         rgb_data = [0] * (self.num_leds * 3)
-        for row_idx, row_keys in enumerate(rows):
-            r, g, b = row_colors[row_idx]
-            for key_idx in row_keys:
-                if key_idx < self.num_leds:
-                    rgb_data[key_idx * 3] = r
-                    rgb_data[key_idx * 3 + 1] = g
-                    rgb_data[key_idx * 3 + 2] = b
+        for row_idx in range(self.layout.num_rows):
+            self.layout.paint(rgb_data, self.layout.group(f'row{row_idx}'), colors[row_idx + 1])
         return rgb_data
 
+    def create_theme_frame(self, colors: list, gradient: bool = False) -> Optional[IndexedFrame]:
+        """
+        Pywal colors as an IndexedFrame whose palette is the pywal color list:
+        every key on color 1, or (gradient) row N on color N + 1. Re-theme it
+        by swapping in Palette(new_colors).
+        """
+        if not colors or len(colors) < (7 if gradient else 2):
+            return None
+        indices = bytearray(self.num_leds)
+        for row_idx in range(self.layout.num_rows):
+            for led in self.layout.group(f'row{row_idx}'):
+                indices[led] = row_idx + 1 if gradient else 1
+        return IndexedFrame(bytes(indices), Palette(colors[:256]))
+
     def set_pywal_gradient(self, colors: list, duration: float = 0.0, should_stop=None) -> bool:
         """Set keyboard rows to different pywal colors."""
         if not colors or len(colors) < 6:
@@ -453,32 +583,39 @@ class AulaF87Pro:
              return False
 
         print(f"Device: Setting pywal gradient, duration: {'infinite' if duration == 0.0 else str(duration)+'s'}")
+        return self.show_frame(rgb_data, duration, should_stop=should_stop, name="Gradient")
 
-        if duration == 0.0:
-            try:
-                while True:
-                    if should_stop and should_stop():
-                        return True
-                    self.send_rgb(rgb_data)
-                    # Check periodically (every 0.1s)
-                    for _ in range(10):
-                        if should_stop and should_stop():
-                            return True
-                        time.sleep(0.1)
-            except KeyboardInterrupt:
-                print("\nDevice: Gradient effect interrupted.")
-                self.turn_off()
-                raise
-        else:
-            try:
-                start_time = time.time()
-                while (time.time() - start_time) < duration:
-                    self.send_rgb(rgb_data)
-                    time.sleep(1)
-                self.turn_off()
-            except KeyboardInterrupt:
-                print("\nDevice: Gradient effect interrupted.")
+    def set_key_colors(self, assignments, base=None, duration: float = 0.0, should_stop=None) -> bool:
+        """Set individual keys or key groups, e.g. from parse_key_spec()."""
+        rgb_data = build_key_frame(assignments, base, self.layout)
+        print(f"Device: Setting per-key colors, duration: {'infinite' if duration == 0.0 else str(duration)+'s'}")
+        return self.show_frame(rgb_data, duration, should_stop=should_stop, name="Per-key")
+
+    def show_frame(self, rgb_data: list, duration: float = 0.0, should_stop=None, name: str = "Static") -> bool:
+        """
+        Keep a static frame on the keyboard, resending it every second.
+        If duration is 0.0 it runs until should_stop() returns True.
+        An IndexedFrame is expanded on every resend, so replacing its palette
+        re-themes what is shown.
+        """
+        if isinstance(rgb_data, IndexedFrame):
+            return self._hold(rgb_data, self.send_rgb, duration, should_stop, name)
+        return self.show_packet(build_packet(rgb_data, self.num_leds), duration, should_stop, name)
+
+    def show_packet(self, packet: bytes, duration: float = 0.0, should_stop=None, name: str = "Static") -> bool:
+        """Like show_frame, but for a report that is already built."""
+        return self._hold(packet, self.send_packet, duration, should_stop, name)
+
+    def _hold(self, frame, send, duration: float, should_stop, name: str) -> bool:
+        try:
+            self.run_frames(lambda elapsed: frame, 1.0, duration, should_stop,
+                            send=send, stop_on_error=False)
+            if duration != 0.0:
                 self.turn_off()
-                raise
+        except KeyboardInterrupt:
+            print(f"\nDevice: {name} effect interrupted.")
+            self.turn_off()
+            raise
+
+        return True
 
-        return True
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""
+Effect registry.
+
+Effects are classes derived from f87pro.effects.base.Effect and are registered
+under the 'f87pro.effects' entry point group, so third-party packages can add
+their own:
+
+    [project.entry-points."f87pro.effects"]
+    sparkle = "my_package.sparkle:SparkleEffect"
+
+The built-in effects are declared the same way in pyproject.toml, which is the
+only list of them: when running from a source checkout without installed
+metadata, that table is read from pyproject.toml directly.
+
+Discovery only reads entry point names and targets; an effect's module is
+imported the first time that effect is loaded (or its summary is asked for).
+"""
+import importlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ENTRY_POINT_GROUP = 'f87pro.effects'
+DISTRIBUTION = 'aula-f87pro-cli'
+
+
+class EffectInfo:
+    """Name and import target of a registered effect; the effect class is loaded on demand."""
+
+    __slots__ = ('name', 'target', 'source', '_cls')
+
+    def __init__(self, name: str, target: str, source: str = 'built-in'):
+        self.name = name
+        self.target = target
+        self.source = source
+        self._cls = None
+
+    @property
+    def summary(self) -> str:
+        """The effect class's summary (imports it; '' if it can't be loaded)."""
+        try:
+            return self.load().summary
+        except (ImportError, AttributeError):
+            return ''
+
+    def load(self):
+        """Import the effect's module and return the effect class."""
+        if self._cls is None:
+            module_name, _, attr = self.target.partition(':')
+            obj = importlib.import_module(module_name)
+            for part in attr.split('.') if attr else []:
+                obj = getattr(obj, part)
+            self._cls = obj
+        return self._cls
+
+
+def _entry_points():
+    from importlib import metadata  # deferred: scanning metadata is only needed for --effect
+
+    eps = metadata.entry_points()
+    if hasattr(eps, 'select'):
+        return eps.select(group=ENTRY_POINT_GROUP)
+    return eps.get(ENTRY_POINT_GROUP, [])
+
+
+def _installed() -> bool:
+    from importlib import metadata
+
+    try:
+        metadata.distribution(DISTRIBUTION)
+    except metadata.PackageNotFoundError:
+        return False
+    return True
+
+
+def _checkout_entry_points() -> List[Tuple[str, str]]:
+    """(name, target) pairs from the entry point table in a source checkout's pyproject.toml."""
+    pyproject = Path(__file__).resolve().parents[3] / 'pyproject.toml'
+    try:
+        lines = pyproject.read_text(encoding='utf-8').splitlines()
+    except OSError:
+        return []
+    header = f'[project.entry-points."{ENTRY_POINT_GROUP}"]'
+    found, in_group = [], False
+    for line in lines:
+        line = line.split('#', 1)[0].strip()
+        if line.startswith('['):
+            in_group = line == header
+        elif in_group and '=' in line:
+            name, _, target = line.partition('=')
+            found.append((name.strip(), target.strip().strip('"\'')))
+    return found
+
+
+@lru_cache(maxsize=None)
+def available_effects() -> Dict[str, EffectInfo]:
+    """All registered effects by name, without importing any of them."""
+    effects = {}
+    if not _installed():
+        effects.update((name, EffectInfo(name, target)) for name, target in _checkout_entry_points())
+    for ep in _entry_points():
+        dist = getattr(ep, 'dist', None)
+        if dist is not None and dist.name == DISTRIBUTION:
+            source = 'built-in'
+        else:
+            source = f"{dist.name} {dist.version}" if dist else 'plugin'
+        effects[ep.name] = EffectInfo(ep.name, ep.value, source)
+    return effects
+
+
+def get_effect(name: str) -> Optional[EffectInfo]:
+    return available_effects().get(name)
+
+
+def create_effect(name: str, **kwargs):
+    """Load the named effect and instantiate it (KeyError if it isn't registered)."""
+    info = get_effect(name)
+    if info is None:
+        raise KeyError(f"Unknown effect: {name}")
+    return info.load()(**kwargs)
@@ -0,0 +1,64 @@
+from typing import Dict, Optional, Tuple
+
+from ..layout import LAYOUT, Layout
+
+
+class Effect:
+    """
+    Base class for animated effects.
+
+    Subclasses implement render(), which is called once per frame with the
+    seconds elapsed since the effect started and returns an RGB frame
+    (num_leds * 3 bytes) or an f87pro.palette.IndexedFrame. Returning the
+    same reused buffer every frame is encouraged. Returning None ends the effect.
+
+    color is an (r, g, b) tuple, base an optional RGB frame or IndexedFrame to
+    animate, and options the raw key=value strings given with --effect-opt.
+    """
+
+    name = ''
+    summary = ''
+    fps = 20.0
+
+    def __init__(self, layout: Layout = LAYOUT, color: Optional[Tuple[int, int, int]] = None,
+                 base=None, options: Optional[Dict[str, str]] = None):
+        self.layout = layout
+        self.color = color
+        self.base = base
+        self.options = options or {}
+        self.frame = bytearray(layout.num_leds * 3)
+        self.fps = self.option('fps', self.fps)
+
+    def option(self, key: str, default: float) -> float:
+        """Numeric option from --effect-opt, falling back to default."""
+        value = self.options.get(key)
+        if value is None:
+            return default
+        try:
+            return float(value)
+        except ValueError:
+            raise ValueError(f"Effect option {key} must be a number, got {value!r}")
+
+    def render(self, elapsed: float):
+        raise NotImplementedError
+
+    def retheme(self, palette) -> bool:
+        """
+        Swap in a new palette for an IndexedFrame base while running (pywal
+        --watch). Returns False if the effect has to be restarted instead.
+        """
+        return False
+
+    def close(self):
+        """Release anything the effect holds open (files, processes)."""
+
+
+def parse_effect_options(pairs) -> Dict[str, str]:
+    """Turn ['speed=2', 'fps=30'] into {'speed': '2', 'fps': '30'}."""
+    options = {}
+    for pair in pairs or []:
+        key, sep, value = pair.partition('=')
+        if not sep or not key.strip():
+            raise ValueError(f"Effect options must look like key=value, got {pair!r}")
+        options[key.strip()] = value.strip()
+    return options
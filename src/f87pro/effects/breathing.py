@@ -0,0 +1,39 @@
+import math
+
+from ..palette import IndexedFrame
+from .base import Effect
+
+
+class BreathingEffect(Effect):
+    """
+    Pulse a solid color, or a base pattern, in and out.
+
+    The pattern is kept as palette indices and only the palette is dimmed each
+    frame, so an IndexedFrame base (pywal colors) can be re-themed in place.
+    """
+
+    name = 'breathing'
+    summary = 'Pulse a color or pattern in and out'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        num_leds = self.layout.num_leds
+        if isinstance(self.base, IndexedFrame):
+            source = self.base
+        elif self.base:
+            source = IndexedFrame.from_rgb(bytes(self.base[:num_leds * 3]).ljust(num_leds * 3, b'\0'))
+        else:
+            source = IndexedFrame.from_rgb(bytes(self.color or (255, 255, 255)) * num_leds)
+        self._palette = source.palette
+        self.frame = IndexedFrame(source.indices[:num_leds].ljust(num_leds, b'\0'), source.palette)
+        self.speed = self.option('speed', 1.5)
+
+    def retheme(self, palette) -> bool:
+        if not isinstance(self.base, IndexedFrame):
+            return False
+        self._palette = palette
+        return True
+
+    def render(self, elapsed: float):
+        self.frame.palette = self._palette.scaled((math.sin(elapsed * self.speed) + 1) / 2)
+        return self.frame
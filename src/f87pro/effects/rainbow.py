@@ -0,0 +1,30 @@
+import colorsys
+
+from .base import Effect
+
+
+class RainbowEffect(Effect):
+    """Rainbow wave sweeping horizontally across the physical layout."""
+
+    name = 'rainbow'
+    summary = 'Rainbow wave sweeping across the keyboard'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.speed = self.option('speed', 0.25)
+        self.brightness = max(0.0, min(1.0, self.option('brightness', 1.0)))
+        # Hue offset of each key, fixed by its position
+        span = self.option('span', 1.0)
+        self._offsets = [x / (self.layout.width or 1) * span for x in self.layout.x]
+
+    def render(self, elapsed: float):
+        frame = self.frame
+        shift = elapsed * self.speed
+        v = self.brightness
+        for slot, led in enumerate(self.layout.leds):
+            r, g, b = colorsys.hsv_to_rgb((self._offsets[slot] - shift) % 1.0, 1.0, v)
+            i = led * 3
+            frame[i] = int(r * 255)
+            frame[i + 1] = int(g * 255)
+            frame[i + 2] = int(b * 255)
+        return frame
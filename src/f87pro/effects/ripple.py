@@ -0,0 +1,35 @@
+import math
+
+from .base import Effect
+
+
+class RippleEffect(Effect):
+    """Rings of color spreading out from a key (default 'g') and repeating."""
+
+    name = 'ripple'
+    summary = 'Rings of color spreading out from a key'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        try:
+            origin = self.layout.slot(self.layout.led(self.options.get('key', 'g')))
+        except KeyError as e:
+            raise ValueError(f"Unknown ripple origin key: {e}")
+        ox, oy = self.layout.x[origin], self.layout.y[origin]
+        self._distances = [math.hypot(x - ox, y - oy) for x, y in zip(self.layout.x, self.layout.y)]
+        self._max_distance = max(self._distances)
+        self.speed = self.option('speed', 8.0)
+        self.width = self.option('width', 1.5)
+        self.color = self.color or (0, 160, 255)
+
+    def render(self, elapsed: float):
+        frame = self.frame
+        r, g, b = self.color
+        radius = (elapsed * self.speed) % (self._max_distance + self.width)
+        for slot, led in enumerate(self.layout.leds):
+            level = max(0.0, 1.0 - abs(self._distances[slot] - radius) / self.width)
+            i = led * 3
+            frame[i] = int(r * level)
+            frame[i + 1] = int(g * level)
+            frame[i + 2] = int(b * level)
+        return frame
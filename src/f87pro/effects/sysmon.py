@@ -0,0 +1,79 @@
+from ..procfs import CpuLoad, MemoryPressure, NetThroughput
+from .base import Effect
+
+
+def heat_color(level: float):
+    """Green (idle) through yellow to red (saturated)."""
+    level = max(0.0, min(1.0, level))
+    if level < 0.5:
+        return (int(510 * level), 255, 0)
+    return (255, int(510 * (1.0 - level)), 0)
+
+
+class SysmonEffect(Effect):
+    """
+    Live system heatmap:
+      top row       network throughput, as a bar growing left to right
+      middle rows   one column band per CPU core, colored by its load
+      bottom row    memory pressure bar
+
+    Options: proc_root (default /proc), net_max (bytes/s for a full bar; by
+    default the bar scales to the highest rate seen), fps (default 10).
+    """
+
+    name = 'sysmon'
+    summary = 'Heatmap of CPU cores, memory and network load'
+    fps = 10.0
+
+    def __init__(self, proc_root: str = None, **kwargs):
+        super().__init__(**kwargs)
+        proc_root = proc_root or self.options.get('proc_root', '/proc')
+        self.cpu = CpuLoad(proc_root)
+        self.memory = MemoryPressure(proc_root)
+        self.net = NetThroughput(proc_root)
+        self.net_max = self.option('net_max', 0.0)
+        self._net_peak = 1.0
+
+        layout = self.layout
+        width = layout.width or 1.0
+        # Fraction of the keyboard width at each key, computed once
+        self._fraction = [x / width for x in layout.x]
+        self._bottom = layout.num_rows - 1
+
+    def _bar(self, row: int, level: float):
+        frame, layout = self.frame, self.layout
+        lit = heat_color(level)
+        for slot, led in enumerate(layout.leds):
+            if layout.rows[slot] == row:
+                r, g, b = lit if self._fraction[slot] <= level else (0, 0, 0)
+                frame[led * 3] = r
+                frame[led * 3 + 1] = g
+                frame[led * 3 + 2] = b
+
+    def render(self, elapsed: float):
+        frame, layout = self.frame, self.layout
+        loads = self.cpu.sample()
+        cores = len(loads) or 1
+
+        for slot, led in enumerate(layout.leds):
+            if 0 < layout.rows[slot] < self._bottom:
+                core = min(int(self._fraction[slot] * cores), cores - 1)
+                r, g, b = heat_color(loads[core] if loads else 0.0)
+                frame[led * 3] = r
+                frame[led * 3 + 1] = g
+                frame[led * 3 + 2] = b
+
+        rate = self.net.sample(elapsed)
+        if self.net_max:
+            net_level = rate / self.net_max
+        else:
+            self._net_peak = max(self._net_peak * 0.99, rate, 1.0)
+            net_level = rate / self._net_peak
+        self._bar(0, net_level)
+        self._bar(self._bottom, self.memory.sample())
+        return frame
+
+    def close(self):
+        self.cpu.close()
+        self.memory.close()
+        self.net.close()
@@ -0,0 +1,117 @@
+"""
+Static gradient compiler.
+
+Each key's physical position is normalized once per layout. A gradient is then
+a per-key parameter t in [0, 1] (projection onto an angle for linear gradients,
+distance from a center for radial ones) mapped through color stops that are
+interpolated in OKLab, so mid-points don't turn muddy or dark the way plain
+RGB blends do. Compiled frames are memoized on (stops, angle, mode, center).
+"""
+import math
+from functools import lru_cache
+from typing import Sequence, Tuple, Union
+
+from .layout import LAYOUT, Layout
+
+RGB = Tuple[int, int, int]
+Stop = Union[RGB, Tuple[float, RGB]]
+
+MODES = ('linear', 'radial')
+
+
+@lru_cache(maxsize=None)
+def key_coordinates(layout: Layout = LAYOUT) -> Tuple[Tuple[float, ...], Tuple[float, ...]]:
+    """Key centers scaled so the longer side spans 0..1, keeping the physical aspect ratio."""
+    scale = max(layout.width, layout.height) or 1.0
+    return (tuple(x / scale for x in layout.x), tuple(y / scale for y in layout.y))
+
+
+def _to_linear(c: float) -> float:
+    c /= 255.0
+    return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+
+def _to_srgb(c: float) -> int:
+    c = c * 12.92 if c <= 0.0031308 else 1.055 * (max(c, 0.0) ** (1 / 2.4)) - 0.055
+    return max(0, min(255, int(round(c * 255))))
+
+
+def rgb_to_oklab(rgb: RGB) -> Tuple[float, float, float]:
+    r, g, b = (_to_linear(c) for c in rgb)
+    l = (0.4122214708 * r + 0.5363325363 * g + 0.0514459929 * b) ** (1 / 3)
+    m = (0.2119034982 * r + 0.6806995451 * g + 0.1073969566 * b) ** (1 / 3)
+    s = (0.0883024619 * r + 0.2817188376 * g + 0.6299787005 * b) ** (1 / 3)
+    return (0.2104542553 * l + 0.7936177850 * m - 0.0040720468 * s,
+            1.9779984951 * l - 2.4285922050 * m + 0.4505937099 * s,
+            0.0259040371 * l + 0.7827717662 * m - 0.8086757660 * s)
+
+
+def oklab_to_rgb(lab: Tuple[float, float, float]) -> RGB:
+    L, a, b = lab
+    l = (L + 0.3963377774 * a + 0.2158037573 * b) ** 3
+    m = (L - 0.1055613458 * a - 0.0638541728 * b) ** 3
+    s = (L - 0.0894841775 * a - 1.2914855480 * b) ** 3
+    return (_to_srgb(4.0767416621 * l - 3.3077115913 * m + 0.2309699292 * s),
+            _to_srgb(-1.2684380046 * l + 2.6097574011 * m - 0.3413193965 * s),
+            _to_srgb(-0.0041960863 * l - 0.7034186147 * m + 1.7076147010 * s))
+
+
+def normalize_stops(stops: Sequence[Stop]) -> Tuple[Tuple[float, RGB], ...]:
+    """Accept plain colors (spread evenly) or (position, color) pairs; return sorted pairs."""
+    if len(stops) < 2:
+        raise ValueError("A gradient needs at least two stops")
+    if all(len(stop) == 2 for stop in stops):
+        pairs = [(float(pos), tuple(color)) for pos, color in stops]
+    else:
+        last = len(stops) - 1
+        pairs = [(i / last, tuple(color)) for i, color in enumerate(stops)]
+    return tuple(sorted(pairs, key=lambda pair: pair[0]))
+
+
+def compile_gradient(stops: Sequence[Stop], angle: float = 0.0, mode: str = 'linear',
+                     center: Tuple[float, float] = (0.5, 0.5), layout: Layout = LAYOUT) -> bytes:
+    """
+    Render a gradient to an RGB frame (num_leds * 3 bytes).
+
+    angle is in degrees for linear gradients: 0 runs left to right, 90 top to
+    bottom. center is the origin of radial gradients, as fractions of the
+    keyboard's width and height.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown gradient mode: {mode} (expected one of {', '.join(MODES)})")
+    return _compile(normalize_stops(stops), float(angle) % 360.0, mode,
+                    (float(center[0]), float(center[1])), layout)
+
+
+@lru_cache(maxsize=64)
+def _compile(stops, angle: float, mode: str, center, layout: Layout) -> bytes:
+    xs, ys = key_coordinates(layout)
+    if mode == 'linear':
+        dx, dy = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+        params = [x * dx + y * dy for x, y in zip(xs, ys)]
+    else:
+        scale = max(layout.width, layout.height) or 1.0
+        cx, cy = center[0] * layout.width / scale, center[1] * layout.height / scale
+        params = [math.hypot(x - cx, y - cy) for x, y in zip(xs, ys)]
+    low, high = min(params), max(params)
+    span = (high - low) or 1.0
+
+    positions = [pos for pos, _ in stops]
+    labs = [rgb_to_oklab(color) for _, color in stops]
+    frame = bytearray(layout.num_leds * 3)
+    for slot, led in enumerate(layout.leds):
+        t = (params[slot] - low) / span
+        if t <= positions[0]:
+            rgb = stops[0][1]
+        elif t >= positions[-1]:
+            rgb = stops[-1][1]
+        else:
+            seg = 0
+            while t > positions[seg + 1]:
+                seg += 1
+            width = (positions[seg + 1] - positions[seg]) or 1.0
+            f = (t - positions[seg]) / width
+            a, b = labs[seg], labs[seg + 1]
+            rgb = oklab_to_rgb(tuple(a[i] + (b[i] - a[i]) * f for i in range(3)))
+        frame[led * 3:led * 3 + 3] = bytes(rgb)
+    return bytes(frame)
@@ -0,0 +1,126 @@
+"""
+Hotplug monitoring through kernel uevents.
+
+The kernel broadcasts a uevent on a netlink socket whenever a device node is
+added or removed. HotplugMonitor watches the 'hidraw' subsystem and reports
+when the keyboard's node goes away and when a node for the same USB
+interface (vendor, product, interface number) comes back, which may be under a
+different hidrawN name.
+"""
+import os
+import re
+import socket
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+NETLINK_KOBJECT_UEVENT = 15
+_KERNEL_GROUP = 1
+
+# .../1-2:1.1/0003:258A:010C.0005/hidraw/hidraw4 -> (0x258a, 0x010c, 1)
+_HIDRAW_DEVPATH = re.compile(
+    r':\d+\.(\d+)/[0-9A-Fa-f]{4}:([0-9A-Fa-f]{4}):([0-9A-Fa-f]{4})\.[0-9A-Fa-f]+/hidraw/hidraw\d+$')
+
+EventSource = Callable[[threading.Event], Iterable[Dict[str, str]]]
+
+
+def parse_uevent(data: bytes) -> Dict[str, str]:
+    """Parse a kernel uevent ('action@devpath\\0KEY=VALUE\\0...') into a dict."""
+    event = {}
+    for field in data.split(b'\0'):
+        key, sep, value = field.partition(b'=')
+        if sep:
+            event[key.decode('utf-8', 'replace')] = value.decode('utf-8', 'replace')
+    return event
+
+
+def interface_identity(devpath: str) -> Optional[Tuple[int, int, int]]:
+    """(vendor id, product id, interface number) of a hidraw device path, if recognisable."""
+    match = _HIDRAW_DEVPATH.search(devpath)
+    if not match:
+        return None
+    return (int(match.group(2), 16), int(match.group(3), 16), int(match.group(1)))
+
+
+def sysfs_identity(device_node: str) -> Optional[Tuple[int, int, int]]:
+    """Identity of an existing /dev/hidrawN node, looked up through sysfs."""
+    name = os.path.basename(device_node)
+    try:
+        devpath = os.path.realpath(f'/sys/class/hidraw/{name}')
+    except OSError:
+        return None
+    return interface_identity(devpath)
+
+
+def netlink_uevents(stop: threading.Event) -> Iterable[Dict[str, str]]:
+    """Yield kernel uevents until stop is set (OSError if netlink is unavailable)."""
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+    try:
+        sock.bind((0, _KERNEL_GROUP))
+        sock.settimeout(0.5)
+        while not stop.is_set():
+            try:
+                data = sock.recv(65536)
+            except socket.timeout:
+                continue
+            yield parse_uevent(data)
+    finally:
+        sock.close()
+
+
+class HotplugMonitor:
+    """
+    Watch for the keyboard's hidraw node disappearing and reappearing.
+
+    on_remove() is called when device_node is removed; on_add(new_node) when a
+    hidraw node for the same interface appears. event_source defaults to the
+    kernel netlink socket; tests can pass any callable that takes the stop
+    event and yields uevent dicts.
+    """
+
+    def __init__(self, device_node: str, on_remove: Callable[[], None],
+                 on_add: Callable[[str], None], event_source: Optional[EventSource] = None,
+                 identity: Optional[Tuple[int, int, int]] = None):
+        self.device_node = device_node
+        self.on_remove = on_remove
+        self.on_add = on_add
+        self.event_source = event_source or netlink_uevents
+        self.identity = identity or sysfs_identity(device_node)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def handle(self, event: Dict[str, str]):
+        if event.get('SUBSYSTEM') != 'hidraw':
+            return
+        node = '/dev/' + event.get('DEVNAME', '')
+        identity = interface_identity(event.get('DEVPATH', ''))
+        action = event.get('ACTION')
+
+        if action == 'remove' and node == self.device_node:
+            self.identity = self.identity or identity
+            self.on_remove()
+        elif action == 'add' and identity is not None and identity == self.identity:
+            self.device_node = node
+            self.on_add(node)
+
+    def _watch(self):
+        try:
+            for event in self.event_source(self._stop_event):
+                if self._stop_event.is_set():
+                    break
+                self.handle(event)
+        except OSError as e:
+            print(f"Hotplug monitoring unavailable: {e}")
+
+    def start(self):
+        """Start watching in a background thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
@@ -0,0 +1,161 @@
+"""
+Run an effect's render loop in a separate process.
+
+The worker renders frames ahead of time into a ring of slots in shared memory,
+paced by two semaphores: 'free' counts slots the worker may fill and 'filled'
+counts frames waiting to be sent, so a fast worker blocks once the ring is full
+(backpressure) and never runs more than a few frames ahead. The main process
+only copies finished frames out of the ring; if the worker is late or has
+crashed, the last good frame is sent again; a worker that hangs is terminated
+on close(). A worker that fails before its
+first frame (bad options, import errors) re-raises its error in the
+constructor, and a worker whose effect ends ends the proxy too.
+"""
+import multiprocessing
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from .layout import LAYOUT
+from .palette import IndexedFrame
+
+# Shared memory header: effect fps (float64), written by the worker before its first frame
+_HEADER = struct.Struct('<d')
+
+_worker_state = {}
+
+
+def _init_worker(shm_name: str, free, filled, stop):
+    # Spawned workers share the parent's resource tracker, so the parent's
+    # unlink() in close() is the only cleanup needed for the segment.
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_state.update(shm=shm, free=free, filled=filled, stop=stop)
+
+
+def _render_loop(effect_name: str, effect_kwargs: dict, slots: int, frame_size: int) -> int:
+    """Worker task: render frames into the ring until told to stop. Returns frames rendered."""
+    from .effects import create_effect
+
+    shm, free, filled, stop = (_worker_state[k] for k in ('shm', 'free', 'filled', 'stop'))
+    effect = create_effect(effect_name, **effect_kwargs)
+    _HEADER.pack_into(shm.buf, 0, effect.fps)
+
+    frame_no = 0
+    while not stop.is_set():
+        if not free.acquire(timeout=0.1):
+            continue
+        frame = effect.render(frame_no / effect.fps)
+        if frame is None:
+            break
+        offset = _HEADER.size + (frame_no % slots) * frame_size
+        if isinstance(frame, IndexedFrame):
+            frame.palette.expand_into(frame.indices[:frame_size // 3], shm.buf, offset)
+        else:
+            data = bytes(frame[:frame_size])
+            shm.buf[offset:offset + len(data)] = data
+        filled.release()
+        frame_no += 1
+    return frame_no
+
+
+class IsolatedEffect:
+    """
+    Effect proxy whose frames are rendered by a worker process.
+
+    Has the same name/fps/render() interface as Effect, so it can be passed to
+    AulaF87Pro.run_effect(). Call close() when done. The constructor raises
+    whatever the worker raised if it fails before rendering a frame.
+    """
+
+    def __init__(self, effect_name: str, slots: int = 4, frame_size: int = LAYOUT.num_leds * 3,
+                 start_timeout: float = 5.0, **effect_kwargs):
+        self.name = effect_name
+        self.slots = slots
+        self.frame_size = frame_size
+        self.last_frame = bytearray(frame_size)
+        self.crashed = False
+        self._read = 0
+
+        ctx = multiprocessing.get_context('spawn')
+        self._shm = shared_memory.SharedMemory(create=True, size=_HEADER.size + slots * frame_size)
+        self._free = ctx.Semaphore(slots)
+        self._filled = ctx.Semaphore(0)
+        self._stop = ctx.Event()
+        self._pool = ProcessPoolExecutor(max_workers=1, mp_context=ctx, initializer=_init_worker,
+                                         initargs=(self._shm.name, self._free, self._filled, self._stop))
+        self._future = self._pool.submit(_render_loop, effect_name, effect_kwargs, slots, frame_size)
+
+        # Wait for the first frame so fps is known and playback starts with real content,
+        # but stop waiting as soon as the worker exits
+        self.fps = 20.0
+        deadline = time.monotonic() + start_timeout
+        while not self._filled.acquire(timeout=0.05):
+            if self._future.done():
+                if self._filled.acquire(block=False):
+                    break  # it rendered a frame just before finishing
+                error = self._future.exception()
+                if error:
+                    self.close()
+                    raise error
+                return  # its effect ended without a frame; render() returns None
+            if time.monotonic() >= deadline:
+                return  # still starting up; render() sends black until frames arrive
+        self.fps = _HEADER.unpack_from(self._shm.buf, 0)[0]
+        self._take_frame()
+
+    def _take_frame(self):
+        offset = _HEADER.size + (self._read % self.slots) * self.frame_size
+        self.last_frame[:] = self._shm.buf[offset:offset + self.frame_size]
+        self._read += 1
+        self._free.release()
+
+    def _check_worker(self) -> bool:
+        """False once the worker has finished normally (its effect ended)."""
+        if not self._future.done():
+            return True
+        error = self._future.exception()
+        if error is None:
+            return False
+        if not self.crashed:
+            self.crashed = True
+            print(f"Effect process for {self.name} failed: {error!r}. Holding last good frame.")
+        return True
+
+    def render(self, elapsed: float):
+        if self._filled.acquire(block=False):
+            self._take_frame()
+        elif not self._check_worker():
+            return None
+        return self.last_frame
+
+    def retheme(self, palette) -> bool:
+        return False  # the effect lives in the worker; restart it instead
+
+    def close(self, timeout: float = 2.0):
+        """
+        Stop the worker and free the ring. A worker that doesn't stop within
+        timeout (an effect stuck in render()) is terminated.
+        """
+        self._stop.set()
+        # The executor has no public handle on its worker process; take it before shutdown clears it
+        processes = list((self._pool._processes or {}).values())
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        deadline = time.monotonic() + timeout
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                print(f"Effect process for {self.name} did not stop; terminating it.")
+                process.terminate()
+                process.join(1.0)
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,240 @@
+import re
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .colors import parse_color_input
+
+# Bump whenever LED indices, positions or groups change so that anything
+# derived from the layout (e.g. compiled profiles) gets rebuilt.
+LAYOUT_VERSION = 1
+
+NUM_LEDS = 102
+
+# LED indices for each key, one list per physical row (left to right)
+_ROWS = [
+    [0, 12, 18, 24, 30, 36, 42, 48, 54, 60, 66, 72, 78, 84, 90, 96],
+    [1, 7, 13, 19, 25, 31, 37, 43, 49, 55, 61, 67, 73, 79, 85, 91, 97],
+    [2, 8, 14, 20, 26, 32, 38, 44, 50, 56, 62, 68, 74, 80, 86, 92, 98],
+    [3, 9, 15, 21, 27, 33, 39, 45, 51, 57, 63, 69, 81],
+    [4, 10, 16, 22, 28, 34, 40, 46, 52, 58, 64, 82, 94],
+    [5, 11, 17, 35, 53, 59, 65, 83, 89, 95, 101],
+]
+
+# Physical key centers in key units, matching _ROWS entry for entry
+_ROW_X = [
+    [0, 2, 3, 4, 5, 6.5, 7.5, 8.5, 9.5, 11, 12, 13, 14, 15.25, 16.25, 17.25],
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13.5, 15.25, 16.25, 17.25],
+    [0.25, 1.5, 2.5, 3.5, 4.5, 5.5, 6.5, 7.5, 8.5, 9.5, 10.5, 11.5, 12.5, 13.75, 15.25, 16.25, 17.25],
+    [0.375, 1.75, 2.75, 3.75, 4.75, 5.75, 6.75, 7.75, 8.75, 9.75, 10.75, 11.75, 13.125],
+    [0.625, 2.25, 3.25, 4.25, 5.25, 6.25, 7.25, 8.25, 9.25, 10.25, 11.25, 13.0, 16.25],
+    [0.125, 1.375, 2.625, 6.375, 10.125, 11.375, 12.625, 13.875, 15.25, 16.25, 17.25],
+]
+_ROW_Y = [0, 1.25, 2.25, 3.25, 4.25, 5.25]
+
+KEY_NAMES = {
+    # Letters
+    'a': 9, 'b': 46, 'c': 34, 'd': 21, 'e': 20, 'f': 27, 'g': 33, 'h': 39,
+    'i': 56, 'j': 45, 'k': 51, 'l': 57, 'm': 52, 'n': 40, 'o': 62, 'p': 68,
+    'q': 8, 'r': 26, 's': 15, 't': 32, 'u': 50, 'v': 28, 'w': 14, 'x': 22,
+    'y': 44, 'z': 16,
+
+    # Numbers
+    '1': 7, '2': 13, '3': 19, '4': 25, '5': 31, '6': 37, '7': 43, '8': 49,
+    '9': 55, '0': 61,
+
+    # Function keys
+    'f1': 12, 'f2': 18, 'f3': 24, 'f4': 30, 'f5': 36, 'f6': 42, 'f7': 48,
+    'f8': 54, 'f9': 60, 'f10': 66, 'f11': 72, 'f12': 78,
+
+    'space': 35, 'enter': 81, 'shift': 4, 'ctrl': 5, 'alt': 11, # 'shift_l', 'ctrl_l', 'alt_l' might be more specific
+    'tab': 2, 'caps_lock': 3, 'backspace': 85, 'escape': 0,
+
+    # Arrow cluster
+    'up': 94, 'left': 89, 'down': 95, 'right': 101,
+
+    # Punctuation
+    ';': 63, "'": 69, ',': 58, '.': 64, '/': 82, '\\': 92, '[': 74, ']': 80,
+    '=': 67, '-': 73, '`': 1
+}
+
+_GROUP_KEYS = {
+    'wasd': ['w', 'a', 's', 'd'],
+    'arrows': ['up', 'left', 'down', 'right'],
+    'fn-row': ['f%d' % n for n in range(1, 13)],
+    'numbers': ['1', '2', '3', '4', '5', '6', '7', '8', '9', '0'],
+    'letters': list('abcdefghijklmnopqrstuvwxyz'),
+}
+
+
+class Layout:
+    """
+    Immutable description of the F87 Pro key matrix.
+
+    Per-key data lives in parallel compact arrays indexed by key slot
+    (0..len(layout)-1); ``leds[slot]`` is the LED index used in RGB frames.
+    Groups, masks and neighbors are computed once at construction so
+    effects can look them up per frame without rebuilding anything.
+    """
+
+    __slots__ = ('version', 'num_leds', 'leds', 'rows', 'cols', 'x', 'y',
+                 'names', 'num_rows', 'num_cols', 'width', 'height',
+                 '_name_to_led', '_groups', '_row_masks', '_col_masks',
+                 '_neighbors', '_slot_of')
+
+    def __init__(self, rows: Sequence[Sequence[int]], row_x: Sequence[Sequence[float]],
+                 row_y: Sequence[float], key_names: Dict[str, int],
+                 group_keys: Dict[str, List[str]], num_leds: int = NUM_LEDS,
+                 version: int = LAYOUT_VERSION):
+        leds, row_of, col_of, xs, ys = [], [], [], [], []
+        for row_idx, row in enumerate(rows):
+            if len(row) != len(row_x[row_idx]):
+                raise ValueError(f"Row {row_idx} has {len(row)} keys but {len(row_x[row_idx])} positions")
+            for col_idx, led in enumerate(row):
+                leds.append(led)
+                row_of.append(row_idx)
+                col_of.append(col_idx)
+                xs.append(float(row_x[row_idx][col_idx]))
+                ys.append(float(row_y[row_idx]))
+
+        set_ = object.__setattr__
+        set_(self, 'version', version)
+        set_(self, 'num_leds', num_leds)
+        set_(self, 'leds', bytes(leds))
+        set_(self, 'rows', bytes(row_of))
+        set_(self, 'cols', bytes(col_of))
+        set_(self, 'x', memoryview(array('f', xs)).toreadonly())
+        set_(self, 'y', memoryview(array('f', ys)).toreadonly())
+        set_(self, 'num_rows', len(rows))
+        set_(self, 'num_cols', max(len(row) for row in rows))
+        set_(self, 'width', max(xs))
+        set_(self, 'height', max(ys))
+
+        slot_of = [-1] * num_leds
+        for slot, led in enumerate(leds):
+            slot_of[led] = slot
+        set_(self, '_slot_of', tuple(slot_of))
+
+        led_names = [''] * num_leds
+        for name, led in key_names.items():
+            if not led_names[led]:
+                led_names[led] = name
+        set_(self, 'names', tuple(led_names[led] for led in leds))
+        set_(self, '_name_to_led', dict(key_names))
+
+        groups = {name: bytes(key_names[k] for k in keys) for name, keys in group_keys.items()}
+        groups['all'] = bytes(leds)
+        for row_idx, row in enumerate(rows):
+            groups[f'row{row_idx}'] = bytes(row)
+        set_(self, '_groups', groups)
+
+        set_(self, '_row_masks', tuple(self._mask(s for s in range(len(leds)) if row_of[s] == r)
+                                       for r in range(len(rows))))
+        set_(self, '_col_masks', tuple(self._mask(s for s in range(len(leds)) if col_of[s] == c)
+                                       for c in range(self.num_cols)))
+
+        # Keys are neighbors when their centers are within ~1.5 key units
+        neighbors = [b''] * num_leds
+        for a, led_a in enumerate(leds):
+            near = [led_b for b, led_b in enumerate(leds)
+                    if a != b and (xs[a] - xs[b]) ** 2 + (ys[a] - ys[b]) ** 2 <= 2.25]
+            neighbors[led_a] = bytes(near)
+        set_(self, '_neighbors', tuple(neighbors))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Layout is immutable")
+
+    def __len__(self) -> int:
+        return len(self.leds)
+
+    def _mask(self, slots) -> bytes:
+        mask = bytearray(self.num_leds)
+        for slot in slots:
+            mask[self.leds[slot]] = 1
+        return bytes(mask)
+
+    def led(self, name: str) -> int:
+        """LED index for a key name (KeyError if unknown)."""
+        return self._name_to_led[name.lower()]
+
+    def slot(self, led: int) -> int:
+        """Key slot for an LED index, or -1 if no key uses that LED."""
+        return self._slot_of[led]
+
+    def position(self, led: int) -> Tuple[int, int]:
+        """(row, col) of the key using this LED."""
+        slot = self._slot_of[led]
+        return (self.rows[slot], self.cols[slot])
+
+    def row_mask(self, row: int) -> bytes:
+        return self._row_masks[row]
+
+    def col_mask(self, col: int) -> bytes:
+        return self._col_masks[col]
+
+    def region_mask(self, x0: float, y0: float, x1: float, y1: float) -> bytes:
+        """Mask of keys whose physical center lies inside the given rectangle."""
+        return self._mask(s for s in range(len(self.leds))
+                          if x0 <= self.x[s] <= x1 and y0 <= self.y[s] <= y1)
+
+    def neighbors(self, led: int) -> bytes:
+        return self._neighbors[led]
+
+    @property
+    def groups(self) -> Tuple[str, ...]:
+        return tuple(self._groups)
+
+    def group(self, name: str) -> bytes:
+        return self._groups[name.lower()]
+
+    def resolve(self, selector: str) -> bytes:
+        """Resolve a group name, key name or '+'-joined list of them to LED indices."""
+        leds = bytearray()
+        for part in selector.split('+'):
+            part = part.strip().lower()
+            if part in self._groups:
+                leds.extend(self._groups[part])
+            elif part in self._name_to_led:
+                leds.append(self._name_to_led[part])
+            else:
+                raise ValueError(f"Unknown key or group: {part}")
+        return bytes(leds)
+
+    def paint(self, rgb_data, leds: bytes, color: Tuple[int, int, int]):
+        """Write color into an RGB frame for every LED index in leds."""
+        r, g, b = color
+        for led in leds:
+            i = led * 3
+            rgb_data[i] = r
+            rgb_data[i + 1] = g
+            rgb_data[i + 2] = b
+        return rgb_data
+
+
+LAYOUT = Layout(_ROWS, _ROW_X, _ROW_Y, KEY_NAMES, _GROUP_KEYS)
+
+_ASSIGNMENT_RE = re.compile(r'([^=,]+)=(.+?)(?=,[^=,]+=|$)')
+
+
+def parse_key_spec(spec: str, layout: Layout = LAYOUT) -> List[Tuple[bytes, Tuple[int, int, int]]]:
+    """
+    Parse 'wasd=red,arrows=#0000ff' into (led indices, rgb) pairs.
+    RGB values with commas work too: 'wasd=255,0,0,space=blue'.
+    """
+    assignments = []
+    for match in _ASSIGNMENT_RE.finditer(spec.strip()):
+        selector, color = match.group(1), match.group(2)
+        assignments.append((layout.resolve(selector), parse_color_input(color)))
+    if not assignments:
+        raise ValueError(f"Invalid key spec: {spec}")
+    return assignments
+
+
+def build_key_frame(assignments, base: Optional[Tuple[int, int, int]] = None,
+                    layout: Layout = LAYOUT) -> list:
+    """Build an RGB frame from key assignments on top of an optional base color."""
+    rgb_data = [0] * (layout.num_leds * 3)
+    if base:
+        layout.paint(rgb_data, layout.group('all'), base)
+    for leds, color in assignments:
+        layout.paint(rgb_data, leds, color)
+    return rgb_data
@@ -0,0 +1,247 @@
+"""
+Notification overlays.
+
+An Overlay paints a color over a set of keys for a limited time, on top of
+whatever effect is running. Overlays are stacked by priority (then by age),
+so a higher priority overlay preempts lower ones on the keys they share; an
+overlay on 'all' preempts the whole frame.
+
+The frame loop hands every frame the effect renders to OverlayManager, which
+keeps a copy of it. Overlays are composed over that copy, and when the last
+overlay expires the copy is sent again as is, so the effect doesn't have to
+re-render anything. Changes (a new alert, an expiry, a blink) are picked up
+whenever the frame loop wakes, which is at least once per frame.
+
+Alerts reach a running instance through OverlayServer, a Unix socket that
+accepts one JSON object per line, e.g.
+    {"color": "red", "keys": "fn-row", "ttl": 10, "priority": 5, "blink": 2, "name": "build"}
+    {"clear": "build"}
+and answers each line with "ok" or "error: <reason>". send_alert() is the
+client used by --alert.
+"""
+import itertools
+import json
+import os
+import socket
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .clock import SYSTEM_CLOCK
+from .colors import parse_color_input
+from .layout import LAYOUT, Layout
+from .palette import IndexedFrame
+
+
+def get_overlay_socket_path() -> Path:
+    """Socket a running instance listens on for alerts."""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return Path(runtime_dir) / "aula-f87pro.sock"
+    return Path.home() / ".cache" / "aula-f87pro" / "alerts.sock"
+
+
+class Overlay:
+    """A color over some keys until 'expires' (clock.monotonic() time), optionally blinking."""
+
+    __slots__ = ('leds', 'color', 'priority', 'expires', 'blink', 'name', 'started', 'seq')
+
+    def __init__(self, leds: bytes, color: Tuple[int, int, int], priority: int = 0,
+                 expires: float = 0.0, blink: float = 0.0, name: Optional[str] = None,
+                 started: float = 0.0, seq: int = 0):
+        self.leds = leds
+        self.color = color
+        self.priority = priority
+        self.expires = expires
+        self.blink = blink  # Hz, 0 = steady
+        self.name = name
+        self.started = started
+        self.seq = seq
+
+    def visible(self, now: float) -> bool:
+        return not self.blink or int((now - self.started) * self.blink * 2) % 2 == 0
+
+
+class OverlayManager:
+    """Active overlays and the cached frame they are drawn over. Thread-safe."""
+
+    def __init__(self, layout: Layout = LAYOUT, clock=SYSTEM_CLOCK):
+        self.layout = layout
+        self.clock = clock
+        self._overlays: List[Overlay] = []  # sorted by (priority, seq)
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._base = bytearray(layout.num_leds * 3)
+        self._out = bytearray(layout.num_leds * 3)
+        self._captured = False
+        self._shown: Tuple = ()
+
+    @property
+    def base(self) -> bytearray:
+        """The last frame captured from the effect."""
+        return self._base
+
+    def show(self, color: Tuple[int, int, int], keys: str = 'all', ttl: float = 5.0,
+             priority: int = 0, blink: float = 0.0, name: Optional[str] = None) -> Overlay:
+        """
+        Add an overlay (ValueError for unknown keys). An overlay with the same
+        name as an active one replaces it.
+        """
+        if ttl <= 0:
+            raise ValueError("Overlay ttl must be positive")
+        now = self.clock.monotonic()
+        overlay = Overlay(self.layout.resolve(keys), tuple(color), int(priority), now + ttl,
+                          max(0.0, float(blink)), name, now, next(self._seq))
+        with self._lock:
+            overlays = [o for o in self._overlays if name is None or o.name != name]
+            overlays.append(overlay)
+            overlays.sort(key=lambda o: (o.priority, o.seq))
+            self._overlays = overlays
+        return overlay
+
+    def clear(self, name: Optional[str] = None) -> int:
+        """Remove the overlays called name, or all of them. Returns how many were removed."""
+        with self._lock:
+            keep = [o for o in self._overlays if name is not None and o.name != name]
+            removed = len(self._overlays) - len(keep)
+            self._overlays = keep
+        return removed
+
+    def capture(self, frame, offset: int = 0) -> None:
+        """Keep a copy of the effect's frame (RGB bytes at offset, or an IndexedFrame)."""
+        size = len(self._base)
+        if isinstance(frame, IndexedFrame):
+            frame.palette.expand_into(frame.indices[:size // 3], self._base)
+        else:
+            n = min(len(frame) - offset, size)
+            self._base[:n] = memoryview(frame)[offset:offset + n] if offset else frame[:n]
+        self._captured = True
+
+    def _state(self, now: float) -> Tuple:
+        """Which overlays are on screen right now; drops expired ones."""
+        if any(o.expires <= now for o in self._overlays):
+            self._overlays = [o for o in self._overlays if o.expires > now]
+        return tuple(o.seq for o in self._overlays if o.visible(now))
+
+    def refresh_due(self, now: float) -> bool:
+        """True if what should be on screen changed since the last compose()."""
+        if not self._captured or (not self._overlays and not self._shown):
+            return False
+        with self._lock:
+            return self._state(now) != self._shown
+
+    def compose(self, now: float) -> Optional[bytearray]:
+        """
+        The cached frame with the visible overlays drawn over it, or None when
+        no overlay is visible (send the effect's frame unchanged).
+        """
+        if not self._overlays and not self._shown:
+            return None
+        with self._lock:
+            self._shown = self._state(now)
+            if not self._shown:
+                return None
+            out = self._out
+            out[:] = self._base
+            for overlay in self._overlays:
+                if overlay.visible(now):
+                    self.layout.paint(out, overlay.leds, overlay.color)
+        return out
+
+    def submit(self, request: dict) -> None:
+        """Apply one alert request (the JSON objects OverlayServer accepts)."""
+        if 'clear' in request:
+            name = request['clear']
+            self.clear(None if name in (True, '*', None) else str(name))
+            return
+        if 'color' not in request:
+            raise ValueError("Alert needs a color")
+        color = request['color']
+        if isinstance(color, (list, tuple)):
+            if len(color) != 3 or not all(isinstance(c, int) and 0 <= c <= 255 for c in color):
+                raise ValueError(f"Invalid RGB color: {color}")
+        else:
+            color = parse_color_input(str(color))
+        self.show(color, str(request.get('keys', 'all')), float(request.get('ttl', 5.0)),
+                  int(request.get('priority', 0)), float(request.get('blink', 0.0)),
+                  request.get('name'))
+
+
+class OverlayServer:
+    """Accept alert requests on a Unix socket and pass them to an OverlayManager."""
+
+    def __init__(self, manager: OverlayManager, path=None):
+        self.manager = manager
+        self.path = Path(path or get_overlay_socket_path())
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        """Bind the socket (OSError if another instance is listening) and serve in the background."""
+        if self.path.exists():
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                    probe.connect(str(self.path))
+                raise OSError(f"Another instance is already listening on {self.path}")
+            except ConnectionRefusedError:
+                self.path.unlink()  # stale socket from an instance that didn't clean up
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(str(self.path))
+        os.chmod(self.path, 0o600)
+        self._sock.listen(4)
+        self._sock.settimeout(0.5)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while not self._stop_event.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            with conn:
+                conn.settimeout(2.0)
+                try:
+                    for line in conn.makefile('r', encoding='utf-8'):
+                        if line.strip():
+                            conn.sendall(self._handle(line).encode('utf-8'))
+                except OSError:
+                    pass
+
+    def _handle(self, line: str) -> str:
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Expected a JSON object")
+            self.manager.submit(request)
+        except (ValueError, TypeError) as e:
+            return f"error: {e}\n"
+        return "ok\n"
+
+    def stop(self):
+        self._stop_event.set()
+        if self._sock is None:
+            return  # never bound; the socket file (if any) belongs to someone else
+        self._sock.close()
+        self._sock = None
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def send_alert(request: dict, path=None, timeout: float = 2.0) -> str:
+    """Send one alert request to a running instance and return its reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(path or get_overlay_socket_path()))
+        sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        sock.shutdown(socket.SHUT_WR)
+        return sock.makefile('r', encoding='utf-8').readline().strip()
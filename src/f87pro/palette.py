@@ -0,0 +1,126 @@
+"""
+Palette-indexed frames.
+
+An IndexedFrame stores one palette index byte per LED plus a Palette of up to
+256 colors, a third of the size of an RGB frame. Expanding to RGB goes through
+three 256-byte translate tables precomputed per palette, one per channel, and
+writes straight into a caller's buffer (usually the report being sent), so it
+costs three bytes.translate() calls and no per-key Python work.
+
+Swapping the palette re-themes a frame without touching its indices.
+"""
+from typing import Dict, Optional, Sequence, Tuple
+
+MAX_COLORS = 256
+
+RGB = Tuple[int, int, int]
+
+
+class Palette:
+    """Up to 256 (r, g, b) colors with precomputed per-channel lookup tables."""
+
+    __slots__ = ('colors', '_red', '_green', '_blue')
+
+    def __init__(self, colors: Sequence[RGB]):
+        if len(colors) > MAX_COLORS:
+            raise ValueError(f"A palette holds at most {MAX_COLORS} colors, got {len(colors)}")
+        self.colors = tuple(tuple(int(c) for c in color) for color in colors)
+        pad = bytes(MAX_COLORS - len(self.colors))
+        self._red = bytes(c[0] for c in self.colors) + pad
+        self._green = bytes(c[1] for c in self.colors) + pad
+        self._blue = bytes(c[2] for c in self.colors) + pad
+
+    def __len__(self) -> int:
+        return len(self.colors)
+
+    def __getitem__(self, index: int) -> RGB:
+        return self.colors[index]
+
+    def scaled(self, brightness: float) -> 'Palette':
+        """Copy of the palette with every color multiplied by brightness (0..1)."""
+        n = len(self.colors)
+        pad = bytes(MAX_COLORS - n)
+        palette = Palette.__new__(Palette)
+        palette._red = bytes([int(c * brightness) for c in self._red[:n]]) + pad
+        palette._green = bytes([int(c * brightness) for c in self._green[:n]]) + pad
+        palette._blue = bytes([int(c * brightness) for c in self._blue[:n]]) + pad
+        palette.colors = tuple(zip(palette._red[:n], palette._green[:n], palette._blue[:n]))
+        return palette
+
+    def pack(self) -> bytes:
+        return bytes(c for color in self.colors for c in color)
+
+    @classmethod
+    def unpack(cls, data) -> 'Palette':
+        return cls([tuple(data[i:i + 3]) for i in range(0, len(data) - len(data) % 3, 3)])
+
+    def expand_into(self, indices, out, offset: int = 0) -> None:
+        """Write the RGB pixels for indices into out[offset:offset + 3 * len(indices)]."""
+        end = offset + len(indices) * 3
+        out[offset:end:3] = indices.translate(self._red)
+        out[offset + 1:end:3] = indices.translate(self._green)
+        out[offset + 2:end:3] = indices.translate(self._blue)
+
+
+class IndexedFrame:
+    """
+    A frame as palette indices (one byte per LED, in LED order) and a Palette.
+
+    Effects may return an IndexedFrame from render() instead of RGB bytes;
+    senders and recorders expand or store it as needed.
+    """
+
+    __slots__ = ('indices', 'palette')
+
+    def __init__(self, indices, palette: Palette):
+        self.indices = indices if isinstance(indices, (bytes, bytearray)) else bytes(indices)
+        self.palette = palette
+
+    def __len__(self) -> int:
+        """Length of the expanded RGB frame."""
+        return len(self.indices) * 3
+
+    def expand_into(self, out, offset: int = 0) -> None:
+        self.palette.expand_into(self.indices, out, offset)
+
+    def to_rgb(self) -> bytes:
+        out = bytearray(len(self.indices) * 3)
+        self.palette.expand_into(self.indices, out)
+        return bytes(out)
+
+    def pack(self) -> bytes:
+        """Serialize as (palette size - 1: u8, palette, indices)."""
+        colors = self.palette.pack() or bytes(3)  # an empty palette is stored as one black entry
+        return bytes((len(colors) // 3 - 1,)) + colors + bytes(self.indices)
+
+    @classmethod
+    def unpack(cls, data, num_leds: int) -> 'IndexedFrame':
+        """Inverse of pack(); ValueError if data is not a packed frame of num_leds LEDs."""
+        if not data:
+            raise ValueError("Empty indexed frame")
+        palette_end = 1 + (data[0] + 1) * 3
+        if len(data) != palette_end + num_leds:
+            raise ValueError(f"Indexed frame is {len(data)} bytes, expected {palette_end + num_leds}")
+        return cls(bytes(data[palette_end:]), Palette.unpack(data[1:palette_end]))
+
+    @classmethod
+    def from_rgb(cls, rgb_data, palette: Optional[Palette] = None) -> 'IndexedFrame':
+        """
+        Quantize an RGB frame, reusing palette's colors where they match exactly
+        and appending the others. ValueError if more than 256 colors are needed.
+        """
+        colors = list(palette.colors) if palette else []
+        lookup: Dict[RGB, int] = {}
+        for i, color in enumerate(colors):
+            lookup.setdefault(color, i)
+        indices = bytearray(len(rgb_data) // 3)
+        for led in range(len(indices)):
+            color = tuple(rgb_data[led * 3:led * 3 + 3])
+            index = lookup.get(color)
+            if index is None:
+                index = lookup[color] = len(colors)
+                if index >= MAX_COLORS:
+                    raise ValueError(f"Frame has more than {MAX_COLORS} colors")
+                colors.append(color)
+            indices[led] = index
+        return cls(bytes(indices), palette if palette and len(colors) == len(palette) else Palette(colors))
@@ -0,0 +1,107 @@
+"""
+Concurrent probing of HID interfaces.
+
+Opening or writing to an unresponsive hidraw node can block for a long time.
+Probes run on a small pool of daemon threads, each with its own timeout
+counted from when it starts; a probe that times out is abandoned (its thread
+is left to finish on its own and a fresh worker takes its place), so a bad
+interface costs one timeout rather than stalling startup. Every probe's
+outcome and duration is logged.
+"""
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+PROBE_TIMEOUT = 1.0
+PROBE_WORKERS = 4
+
+T = TypeVar('T')
+
+
+def _run_probes(candidates: Sequence[T], probe: Callable[[T], bool], timeout: float,
+                workers: int, label: Callable[[T], str], log: Callable[[str], None],
+                first: bool) -> List[T]:
+    if not candidates:
+        return []
+    pending: queue.SimpleQueue = queue.SimpleQueue()
+    for index in range(len(candidates)):
+        pending.put(index)
+    results: queue.SimpleQueue = queue.SimpleQueue()
+    cancel = threading.Event()
+    started = {}
+    lock = threading.Lock()
+
+    def worker():
+        while not cancel.is_set():
+            try:
+                index = pending.get_nowait()
+            except queue.Empty:
+                return
+            start = time.monotonic()
+            with lock:
+                started[index] = start
+            try:
+                ok, error = bool(probe(candidates[index])), None
+            except Exception as e:
+                ok, error = False, e
+            results.put((index, ok, time.monotonic() - start, error))
+
+    def spawn():
+        threading.Thread(target=worker, daemon=True).start()
+
+    for _ in range(min(workers, len(candidates))):
+        spawn()
+
+    matches: List[T] = []
+    finished = set()
+    try:
+        while len(finished) < len(candidates):
+            now = time.monotonic()
+            with lock:
+                running = {i: s for i, s in started.items() if i not in finished}
+            for index, start in running.items():
+                if now - start >= timeout:
+                    log(f"  {label(candidates[index])}: no answer after {timeout:g} s, skipped")
+                    finished.add(index)
+                    spawn()  # its worker is stuck; keep the pool at full size
+            if len(finished) == len(candidates):
+                break
+            deadlines = [s + timeout for i, s in running.items() if i not in finished]
+            wait = max(0.0, min(deadlines) - now) if deadlines else timeout
+            try:
+                index, ok, elapsed, error = results.get(timeout=wait)
+            except queue.Empty:
+                continue
+            if index in finished:
+                continue  # answered after its timeout; already skipped
+            finished.add(index)
+            if error is not None:
+                log(f"  {label(candidates[index])}: failed after {elapsed * 1000:.1f} ms ({error})")
+            else:
+                log(f"  {label(candidates[index])}: {'responded' if ok else 'rejected'} "
+                    f"in {elapsed * 1000:.1f} ms")
+            if ok:
+                matches.append(candidates[index])
+                if first:
+                    break
+    finally:
+        cancel.set()  # probes that haven't started yet never will
+    return matches
+
+
+def probe_first(candidates: Sequence[T], probe: Callable[[T], bool], timeout: float = PROBE_TIMEOUT,
+                workers: int = PROBE_WORKERS, label: Callable[[T], str] = str,
+                log: Callable[[str], None] = print) -> Optional[T]:
+    """Probe candidates concurrently and return the first that probe() accepts, or None."""
+    matches = _run_probes(list(candidates), probe, timeout, workers, label, log, first=True)
+    return matches[0] if matches else None
+
+
+def probe_all(candidates: Sequence[T], probe: Callable[[T], bool], timeout: float = PROBE_TIMEOUT,
+              workers: int = PROBE_WORKERS, label: Callable[[T], str] = str,
+              log: Callable[[str], None] = print) -> List[T]:
+    """Probe candidates concurrently and return every accepted one, in the original order."""
+    candidates = list(candidates)
+    matches = _run_probes(candidates, probe, timeout, workers, label, log, first=False)
+    return [c for c in candidates if any(c is m for m in matches)]
@@ -0,0 +1,151 @@
+"""
+Cheap, repeated readers for /proc.
+
+Each reader keeps its file descriptor open and re-reads it from offset 0 with
+preadv into a buffer it owns, so a 10 Hz monitor doesn't open, allocate and
+close files on every tick. Parsing searches that buffer in place and only
+slices out the lines it needs (e.g. /proc/stat's cpu lines, not its long
+intr line). The /proc root can be changed (e.g. to a directory
+of fixture files).
+"""
+import os
+from array import array
+from typing import List
+
+
+class ProcFile:
+    """A /proc file kept open and re-read into a reused buffer."""
+
+    __slots__ = ('path', 'fd', 'buf')
+
+    def __init__(self, path: str, size: int = 4096):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+        self.buf = bytearray(size)
+
+    def read(self) -> int:
+        """Re-read the file into self.buf; returns its length (self.buf[:length] is valid)."""
+        while True:
+            n = os.preadv(self.fd, [self.buf], 0)
+            if n < len(self.buf):
+                return n
+            # Didn't fit; grow the buffer once and read again
+            self.buf = bytearray(len(self.buf) * 2)
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class CpuLoad:
+    """Per-core CPU load from /proc/stat, as deltas since the previous sample."""
+
+    __slots__ = ('_file', '_prev_total', '_prev_idle', 'loads')
+
+    def __init__(self, proc_root: str = '/proc'):
+        self._file = ProcFile(os.path.join(proc_root, 'stat'))
+        self._prev_total = array('Q')
+        self._prev_idle = array('Q')
+        self.loads: List[float] = []
+        self.sample()
+
+    def sample(self) -> List[float]:
+        """Update and return the load of each core (0.0-1.0) since the last sample."""
+        n = self._file.read()
+        buf = self._file.buf
+        core = 0
+        # Per-core lines only: 'cpu0 ...', 'cpu1 ...', right after the aggregate 'cpu ' line
+        start = buf.find(b'\ncpu', 0, n) + 1
+        while start and buf.startswith(b'cpu', start, n):
+            end = buf.find(b'\n', start, n)
+            if end < 0:
+                end = n
+            values = [int(v) for v in buf[start:end].split()[1:9]]
+            total = sum(values)
+            idle = values[3] + values[4]  # idle + iowait
+
+            if core == len(self._prev_total):
+                self._prev_total.append(total)
+                self._prev_idle.append(idle)
+                self.loads.append(0.0)
+            else:
+                d_total = total - self._prev_total[core]
+                d_idle = idle - self._prev_idle[core]
+                self.loads[core] = (1.0 - d_idle / d_total) if d_total > 0 else 0.0
+                self._prev_total[core] = total
+                self._prev_idle[core] = idle
+            core += 1
+            start = end + 1
+        return self.loads
+
+    def close(self):
+        self._file.close()
+
+
+class MemoryPressure:
+    """Fraction of memory in use, from MemTotal and MemAvailable in /proc/meminfo."""
+
+    __slots__ = ('_file',)
+
+    def __init__(self, proc_root: str = '/proc'):
+        self._file = ProcFile(os.path.join(proc_root, 'meminfo'))
+
+    @staticmethod
+    def _field(buf: bytearray, n: int, name: bytes) -> int:
+        start = buf.find(name, 0, n)
+        if start < 0:
+            return 0
+        start += len(name)
+        return int(buf[start:buf.find(b'kB', start, n)])
+
+    def sample(self) -> float:
+        n = self._file.read()
+        buf = self._file.buf
+        total = self._field(buf, n, b'MemTotal:')
+        available = self._field(buf, n, b'MemAvailable:')
+        return 1.0 - available / total if total else 0.0
+
+    def close(self):
+        self._file.close()
+
+
+class NetThroughput:
+    """Combined receive + transmit bytes/s over all non-loopback interfaces in /proc/net/dev."""
+
+    __slots__ = ('_file', '_prev_bytes', '_prev_time')
+
+    def __init__(self, proc_root: str = '/proc'):
+        self._file = ProcFile(os.path.join(proc_root, 'net', 'dev'))
+        self._prev_bytes = self._total_bytes()
+        self._prev_time = None
+
+    def _total_bytes(self) -> int:
+        n = self._file.read()
+        buf = self._file.buf
+        total = 0
+        # One line per interface after the two header lines: '  eth0: rx_bytes ... tx_bytes ...'
+        start = buf.find(b'\n', buf.find(b'\n', 0, n) + 1, n) + 1
+        while 0 < start < n:
+            end = buf.find(b'\n', start, n)
+            if end < 0:
+                end = n
+            colon = buf.find(b':', start, end)
+            if colon >= 0 and buf[start:colon].strip() != b'lo':
+                fields = buf[colon + 1:end].split()
+                total += int(fields[0]) + int(fields[8])
+            start = end + 1
+        return total
+
+    def sample(self, now: float) -> float:
+        """Bytes per second since the previous sample taken at time 'now' (seconds)."""
+        current = self._total_bytes()
+        rate = 0.0
+        if self._prev_time is not None and now > self._prev_time:
+            rate = max(0, current - self._prev_bytes) / (now - self._prev_time)
+        self._prev_bytes = current
+        self._prev_time = now
+        return rate
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+from .colors import parse_color_input
+from .device import build_packet
+from .gradient import compile_gradient
+from .layout import LAYOUT, Layout
+from .palette import IndexedFrame
+
+# Compiled profiles are stored as packed IndexedFrames (palette + one index per
+# LED, usually 100-200 bytes) and expanded into a report when loaded:
+#   <cache dir>/<hash of profile path>-<hash of profile contents + layout version>.bin
+# Editing the profile (or bumping LAYOUT_VERSION) changes the file name, so a
+# stale frame is never picked up; the old file is removed on the next compile.
+# RENDER_VERSION is hashed in too, for changes to how profiles are rendered.
+RENDER_VERSION = 3
+
+
+def get_profile_cache_dir() -> Path:
+    """Get the directory holding compiled profile reports."""
+    return Path.home() / ".cache" / "aula-f87pro" / "profiles"
+
+
+def parse_profile(raw: bytes, suffix: str) -> dict:
+    """Parse profile contents as TOML (.toml) or JSON (anything else)."""
+    if suffix.lower() == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ImportError(
+                    "TOML profiles need Python 3.11+ or the 'tomli' package.\n"
+                    "Install it with: pip install tomli\n"
+                    "Or use a JSON profile instead."
+                )
+        return tomllib.loads(raw.decode('utf-8'))
+    return json.loads(raw.decode('utf-8'))
+
+
+def _color(value) -> Tuple[int, int, int]:
+    if isinstance(value, (list, tuple)):
+        if len(value) != 3 or not all(isinstance(c, int) and 0 <= c <= 255 for c in value):
+            raise ValueError(f"Invalid RGB color: {value}")
+        return tuple(value)
+    return parse_color_input(str(value))
+
+
+def render_profile(profile: dict, layout: Layout = LAYOUT) -> list:
+    """
+    Render a profile to an RGB frame. Layers are applied in order:
+      base      color for every key
+      gradient  {"stops": [colors...], "mode": "linear" | "radial", "angle": degrees,
+                 "center": [x, y]} (see f87pro.gradient; "direction": "vertical" = angle 90)
+      rows      one color per row, top to bottom (null/omitted rows are skipped)
+      keys      {"wasd": "red", "space+enter": "#00ff00", ...}
+    """
+    rgb_data = [0] * (layout.num_leds * 3)
+
+    if 'base' in profile:
+        layout.paint(rgb_data, layout.group('all'), _color(profile['base']))
+
+    gradient = profile.get('gradient')
+    if gradient:
+        angle = gradient.get('angle', 90.0 if gradient.get('direction') == 'vertical' else 0.0)
+        frame = compile_gradient([_color(c) for c in gradient.get('stops', [])], angle,
+                                 gradient.get('mode', 'linear'), tuple(gradient.get('center', (0.5, 0.5))),
+                                 layout)
+        for led in layout.leds:
+            rgb_data[led * 3:led * 3 + 3] = frame[led * 3:led * 3 + 3]
+
+    for row_idx, color in enumerate(profile.get('rows', [])[:layout.num_rows]):
+        if color is not None:
+            layout.paint(rgb_data, layout.group(f'row{row_idx}'), _color(color))
+
+    for selector, color in profile.get('keys', {}).items():
+        layout.paint(rgb_data, layout.resolve(selector), _color(color))
+
+    return rgb_data
+
+
+def profile_cache_path(profile_path: Path, raw: bytes, layout: Layout = LAYOUT,
+                       cache_dir: Optional[Path] = None) -> Path:
+    """Cache file for a profile's current contents."""
+    cache_dir = cache_dir or get_profile_cache_dir()
+    path_hash = hashlib.sha256(str(profile_path.resolve()).encode('utf-8')).hexdigest()[:16]
+    content_hash = hashlib.sha256(raw + b'\0layout-v%d-render-v%d' % (layout.version, RENDER_VERSION)).hexdigest()[:32]
+    return cache_dir / f"{path_hash}-{content_hash}.bin"
+
+
+def compile_profile(profile_path: Path, raw: bytes, cache_file: Path,
+                    layout: Layout = LAYOUT) -> bytes:
+    """Render a profile and store it in cache_file, dropping older versions. Returns the report."""
+    frame = IndexedFrame.from_rgb(render_profile(parse_profile(raw, profile_path.suffix), layout))
+
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        prefix = cache_file.name.split('-', 1)[0]
+        for stale in cache_file.parent.glob(f"{prefix}-*.bin"):
+            stale.unlink()
+        tmp_file = cache_file.with_suffix('.tmp')
+        tmp_file.write_bytes(frame.pack())
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        print(f"Warning: could not cache compiled profile: {e}")
+
+    return build_packet(frame, layout.num_leds)
+
+
+def load_profile_packet(profile_path, layout: Layout = LAYOUT,
+                        cache_dir: Optional[Path] = None) -> bytes:
+    """
+    Get the ready-to-send report for a profile, compiling it only when the
+    profile (or layout) changed since the last time.
+    """
+    profile_path = Path(profile_path).expanduser()
+    raw = profile_path.read_bytes()
+    cache_file = profile_cache_path(profile_path, raw, layout, cache_dir)
+
+    try:
+        return build_packet(IndexedFrame.unpack(cache_file.read_bytes(), layout.num_leds), layout.num_leds)
+    except (OSError, ValueError):
+        pass
+
+    return compile_profile(profile_path, raw, cache_file, layout)
@@ -1,5 +1,6 @@
 import os
 import threading
+import time
 from pathlib import Path
 from typing import List, Tuple, Optional, Callable
 
@@ -120,16 +121,18 @@ class WalFileWatcher:
         # Initialize last colors
         self._last_colors = load_wal_colors()
         
-        for event in i.event_gen(yield_nones=False):
+        # Wake up at least once a second so stop() doesn't leave the thread blocked
+        for event in i.event_gen(timeout_s=1, yield_nones=True):
             if self._stop_event.is_set():
                 break
+            if event is None:
+                continue
                 
             (_, type_names, path, filename) = event
             
             # Check if it's our file and a write/move event
             if filename == wal_filename and any(t in type_names for t in ['IN_CLOSE_WRITE', 'IN_MOVED_TO']):
                 # Debounce
-                import time
                 time.sleep(self.debounce_seconds)
                 
                 if self._stop_event.is_set():
@@ -155,4 +158,3 @@ class WalFileWatcher:
         self._stop_event.set()
         if self._thread:
             self._thread.join(timeout=2.0)
-        return self._use_inotify
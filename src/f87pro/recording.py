@@ -0,0 +1,269 @@
+import mmap
+import struct
+from typing import Dict, List, Optional
+
+from .layout import LAYOUT
+from .palette import MAX_COLORS, IndexedFrame, Palette
+
+# File layout:
+#   header  magic 'F87F', version, flags, frame size, fps (float32), frame count
+#   frames  repeated (kind: u8, payload length: u16, payload)
+#
+# FRAME_RAW payloads are a full frame. FRAME_DELTA payloads patch the previous
+# frame with runs of (skip: u8, count: u8, pixels), measured in pixels: skip
+# unchanged pixels, then write count literal pixels, or - when the high bit of
+# count is set - repeat one pixel (count & 0x7f) times. The first frame is
+# always raw, so playback can loop by rewinding to the first record.
+#
+# With FLAG_INDEXED (version 2), frames hold one palette index per LED (a pixel
+# is one byte instead of three; frame size in the header is still the RGB
+# size) and FRAME_PALETTE records (start: u8, colors) replace the palette from
+# entry 'start' on. A palette record always precedes the frames that use it.
+MAGIC = b'F87F'
+VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+HEADER = struct.Struct('<4sBBHfI')
+RECORD = struct.Struct('<BH')
+
+FLAG_DELTA = 0x01
+FLAG_INDEXED = 0x02
+
+FRAME_RAW = 0
+FRAME_DELTA = 1
+FRAME_PALETTE = 2
+
+_REPEAT = 0x80
+_MAX_RUN = 0x7f
+
+
+def encode_delta(prev, frame, pixel: int = 3) -> bytes:
+    """Encode frame as skip/literal/repeat runs of pixel-byte pixels against prev (same length)."""
+    out = bytearray()
+    w = pixel
+    n = len(frame) // w
+    i = 0
+    while i < n:
+        skip = 0
+        while i < n and skip < 255 and frame[i * w:i * w + w] == prev[i * w:i * w + w]:
+            i += 1
+            skip += 1
+        if i == n:
+            break  # trailing unchanged pixels need no run
+
+        value = frame[i * w:i * w + w]
+        j = i + 1
+        while j < n and j - i < _MAX_RUN and frame[j * w:j * w + w] == value:
+            j += 1
+        if j - i > 1:
+            out += bytes((skip, _REPEAT | (j - i))) + value
+        else:
+            # Literal run until an unchanged pixel or the start of a repeat
+            while (j < n and j - i < _MAX_RUN and frame[j * w:j * w + w] != prev[j * w:j * w + w]
+                   and (j + 1 >= n or frame[j * w:j * w + w] != frame[j * w + w:j * w + 2 * w])):
+                j += 1
+            out += bytes((skip, j - i)) + frame[i * w:j * w]
+        i = j
+    return bytes(out)
+
+
+def apply_delta(buf: bytearray, payload, pixel: int = 3) -> None:
+    """Apply a FRAME_DELTA payload to buf in place."""
+    w = pixel
+    pos, i, n = 0, 0, len(payload)
+    while i < n:
+        pos += payload[i] * w
+        count = payload[i + 1]
+        i += 2
+        if count & _REPEAT:
+            count &= _MAX_RUN
+            buf[pos:pos + count * w] = bytes(payload[i:i + w]) * count
+            i += w
+        else:
+            buf[pos:pos + count * w] = payload[i:i + count * w]
+            i += count * w
+        pos += count * w
+
+
+class FrameRecorder:
+    """
+    Append frames to a recording file, optionally delta/RLE compressed and
+    optionally palette-indexed (about a third of the size for effects with
+    few distinct colors; frames needing more than 256 colors raise ValueError).
+
+    A recording has one frame rate. fps=None takes it from the first frame
+    loop that records (see AulaF87Pro.run_frames); add_at() resamples frames
+    from loops running at other rates.
+    """
+
+    __slots__ = ('path', 'fps', 'delta', 'indexed', 'frame_size', 'frame_count', 'start',
+                 '_file', '_prev', '_colors', '_lookup')
+
+    def __init__(self, path: str, fps: Optional[float] = None, delta: bool = True,
+                 frame_size: int = LAYOUT.num_leds * 3, indexed: bool = False):
+        self.path = path
+        self.fps = fps
+        self.start: Optional[float] = None  # clock time of frame 0, set by the first add_at()
+        self.delta = delta
+        self.indexed = indexed
+        self.frame_size = frame_size
+        self.frame_count = 0
+        self._prev: Optional[bytes] = None
+        self._colors: List[bytes] = []
+        self._lookup: Dict[bytes, int] = {}
+        self._file = open(path, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        flags = (FLAG_DELTA if self.delta else 0) | (FLAG_INDEXED if self.indexed else 0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, flags, self.frame_size, self.fps or 0.0, self.frame_count))
+
+    def _write(self, kind: int, payload: bytes):
+        self._file.write(RECORD.pack(kind, len(payload)))
+        self._file.write(payload)
+
+    def _to_indices(self, frame: bytes) -> bytes:
+        """Map frame's pixels to palette indices, writing a palette record for new colors."""
+        pixels = [frame[i:i + 3] for i in range(0, len(frame), 3)]
+        new = [p for p in dict.fromkeys(pixels) if p not in self._lookup]
+        start = len(self._colors)
+        if start + len(new) > MAX_COLORS:
+            # Palette full: start over with just this frame's colors
+            self._colors, self._lookup, start = [], {}, 0
+            new = list(dict.fromkeys(pixels))
+            if len(new) > MAX_COLORS:
+                raise ValueError(f"Frame has more than {MAX_COLORS} colors; record it unindexed")
+        if new:
+            for p in new:
+                self._lookup[p] = len(self._colors)
+                self._colors.append(p)
+            self._write(FRAME_PALETTE, bytes((start,)) + b''.join(self._colors[start:]))
+        return bytes(self._lookup[p] for p in pixels)
+
+    def _use_palette(self, palette: Palette) -> None:
+        """Make palette the current one, writing a record for the entries that changed."""
+        colors = [bytes(color) for color in palette.colors]
+        start = 0
+        while start < len(colors) and start < len(self._colors) and colors[start] == self._colors[start]:
+            start += 1
+        if start < len(colors) or len(colors) != len(self._colors):
+            self._write(FRAME_PALETTE, bytes((start,)) + b''.join(colors[start:]))
+        self._colors = colors
+        self._lookup = {}
+        for i, color in enumerate(colors):
+            self._lookup.setdefault(color, i)
+
+    def add(self, frame) -> None:
+        """Record one frame (any bytes-like, list of ints or IndexedFrame)."""
+        pixel = 3
+        if isinstance(frame, IndexedFrame) and self.indexed:
+            # Keep the effect's own indices; only changed palette entries are written
+            self._use_palette(frame.palette)
+            size = self.frame_size // 3
+            frame, pixel = bytes(frame.indices[:size]).ljust(size, b'\0'), 1
+        else:
+            if isinstance(frame, IndexedFrame):
+                frame = frame.to_rgb()
+            frame = bytes(frame[:self.frame_size]).ljust(self.frame_size, b'\0')
+            if self.indexed:
+                frame, pixel = self._to_indices(frame), 1
+        if self.delta and self._prev is not None:
+            payload = encode_delta(self._prev, frame, pixel)
+            if len(payload) < len(frame):
+                self._write(FRAME_DELTA, payload)
+            else:
+                self._write(FRAME_RAW, frame)
+        else:
+            self._write(FRAME_RAW, frame)
+        self._prev = frame
+        self.frame_count += 1
+
+    def add_at(self, frame, now: float) -> None:
+        """
+        Record frame as shown from clock time now, resampled to self.fps: it fills
+        every slot up to now that isn't filled yet, so frames from a slower loop
+        are repeated and extra frames from a faster one are dropped.
+        """
+        if self.start is None:
+            self.start = now
+        for _ in range(int((now - self.start) * self.fps + 1e-6) + 1 - self.frame_count):
+            self.add(frame)
+
+    def close(self):
+        """Finalize the header with the frame count and fps, and close the file."""
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        self._write_header()
+        self._file.close()
+
+
+class FramePlayer:
+    """
+    Memory-mapped reader for files written by FrameRecorder.
+    Frames are decoded into one reused RGB buffer; next_frame() loops forever.
+    """
+
+    __slots__ = ('path', 'fps', 'flags', 'frame_size', 'frame_count', 'frame',
+                 'indexed', 'palette', '_indices', '_file', '_map', '_offset')
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Recording is empty: {path}")
+
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise ValueError(f"Not a frame recording: {path}")
+        magic, version, self.flags, self.frame_size, self.fps, self.frame_count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version not in SUPPORTED_VERSIONS:
+            self.close()
+            raise ValueError(f"Not a frame recording (or unsupported version): {path}")
+        if len(self._map) <= HEADER.size:
+            self.close()
+            raise ValueError(f"Recording has no frames: {path}")
+
+        self.frame = bytearray(self.frame_size)
+        self.indexed = bool(self.flags & FLAG_INDEXED)
+        self.palette = Palette([])
+        self._indices = bytearray(self.frame_size // 3)
+        self._offset = HEADER.size
+
+    def next_frame(self) -> bytearray:
+        """Decode the next frame into self.frame, rewinding at the end of the file."""
+        rewound = False
+        while True:
+            if self._offset + RECORD.size > len(self._map):
+                if rewound:
+                    raise ValueError(f"Recording has no frames: {self.path}")
+                self._offset, rewound = HEADER.size, True
+            kind, length = RECORD.unpack_from(self._map, self._offset)
+            start = self._offset + RECORD.size
+            self._offset = start + length
+            payload = memoryview(self._map)[start:start + length]
+            try:
+                if kind == FRAME_PALETTE:
+                    colors = self.palette.colors[:payload[0]] + Palette.unpack(payload[1:]).colors
+                    self.palette = Palette(colors)
+                    continue
+                target, pixel = (self._indices, 1) if self.indexed else (self.frame, 3)
+                if kind == FRAME_RAW:
+                    target[:] = payload
+                elif kind == FRAME_DELTA:
+                    apply_delta(target, payload, pixel)
+                else:
+                    raise ValueError(f"Corrupt recording: unknown frame type {kind}")
+            finally:
+                payload.release()
+            if self.indexed:
+                self.palette.expand_into(self._indices, self.frame)
+            return self.frame
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
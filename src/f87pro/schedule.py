@@ -0,0 +1,336 @@
+"""
+Playlists and time-of-day schedules, run in one process on one HID handle.
+
+A schedule file (TOML or JSON, like profiles) has either a playlist, cycled
+in order:
+
+    crossfade = 2.0               # seconds, default 1
+    [[playlist]]
+    effect = "rainbow"
+    options = { speed = 0.5 }
+    duration = 600                # seconds, required for playlist entries
+    [[playlist]]
+    profile = "coding.toml"       # relative to the schedule file
+    duration = 300
+
+or time-of-day entries, each active from its time until the next one:
+
+    [[at]]
+    time = "07:30"
+    profile = "day.toml"
+    [[at]]
+    time = "22:00"
+    effect = "breathing"
+    color = "#ff8800"
+    brightness = 0.3
+
+A scene is an effect (with optional color, options and fps, animating the
+scene's static layers if it has any), a profile file, or inline profile
+layers (base, gradient, rows, keys; 'color' is short for base). 'brightness'
+scales any scene.
+
+Upcoming transitions live in one heap keyed by deadline. Each scene runs on
+the keyboard's frame loop until the earliest deadline, so nothing polls the
+schedule; then the outgoing and incoming scenes are both rendered and
+cross-faded before the outgoing one is closed.
+"""
+import heapq
+import itertools
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from .colors import parse_color_input
+from .effects import available_effects, create_effect
+from .layout import LAYOUT, Layout
+from .palette import IndexedFrame
+from .profile import load_profile_packet, parse_profile, render_profile
+
+_PROFILE_KEYS = ('base', 'gradient', 'rows', 'keys')
+
+
+def parse_time_of_day(value: str) -> Tuple[int, int, int]:
+    """'HH:MM' or 'HH:MM:SS' -> (hour, minute, second)."""
+    parts = str(value).split(':')
+    try:
+        if len(parts) not in (2, 3):
+            raise ValueError
+        hour, minute, second = (int(p) for p in parts + ['0'] * (3 - len(parts)))
+    except ValueError:
+        raise ValueError(f"Invalid time of day {value!r} (expected HH:MM)")
+    if not (0 <= hour < 24 and 0 <= minute < 60 and 0 <= second < 60):
+        raise ValueError(f"Invalid time of day {value!r}")
+    return hour, minute, second
+
+
+def _on_day(wall: float, hms: Tuple[int, int, int], offset: int) -> float:
+    t = time.localtime(wall)
+    return time.mktime((t.tm_year, t.tm_mon, t.tm_mday + offset, *hms, 0, 0, -1))
+
+
+def next_occurrence(wall: float, hms: Tuple[int, int, int]) -> float:
+    """First wall-clock time after wall at which the local time is hms."""
+    when = _on_day(wall, hms, 0)
+    return when if when > wall else _on_day(wall, hms, 1)
+
+
+def last_occurrence(wall: float, hms: Tuple[int, int, int]) -> float:
+    """Latest wall-clock time at or before wall at which the local time was hms."""
+    when = _on_day(wall, hms, 0)
+    return when if when <= wall else _on_day(wall, hms, -1)
+
+
+class Scene:
+    """One entry of a schedule; start() turns it into an ActiveScene."""
+
+    __slots__ = ('label', 'spec', 'base_dir', 'brightness', 'duration', 'at')
+
+    def __init__(self, spec: dict, base_dir: Path = Path('.')):
+        self.spec = spec
+        self.base_dir = base_dir
+        self.brightness = float(spec.get('brightness', 1.0))
+        if not 0.0 <= self.brightness <= 1.0:
+            raise ValueError(f"brightness must be between 0 and 1, got {self.brightness}")
+        self.duration = float(spec['duration']) if 'duration' in spec else None
+        self.at = parse_time_of_day(spec['time']) if 'time' in spec else None
+
+        effect = spec.get('effect')
+        if effect is not None and effect not in available_effects():
+            raise ValueError(f"Unknown effect in schedule: {effect}")
+        profile = spec.get('profile')
+        if profile is not None and not self._profile_path().is_file():
+            raise ValueError(f"Profile not found: {self._profile_path()}")
+        if effect is None and profile is None and not any(k in spec for k in _PROFILE_KEYS + ('color',)):
+            raise ValueError(f"Schedule entry needs an effect, profile or colors: {spec}")
+        if not isinstance(spec.get('options', {}), dict):
+            raise ValueError(f"Schedule entry options must be a table: {spec}")
+        self.label = str(spec.get('name') or effect or (Path(profile).stem if profile else spec.get('color', 'static')))
+
+    def _profile_path(self) -> Path:
+        path = Path(self.spec['profile']).expanduser()
+        return path if path.is_absolute() else self.base_dir / path
+
+    def _static_frame(self, layout: Layout) -> Optional[bytes]:
+        spec = self.spec
+        if 'profile' in spec:
+            packet = load_profile_packet(self._profile_path(), layout)
+            return packet[8:8 + layout.num_leds * 3]
+        layers = {k: spec[k] for k in _PROFILE_KEYS if k in spec}
+        if 'color' in spec and 'effect' not in spec:
+            layers.setdefault('base', spec['color'])
+        if not layers:
+            return None
+        return bytes(render_profile(layers, layout))
+
+    def start(self, now: float, layout: Layout = LAYOUT) -> 'ActiveScene':
+        frame = self._static_frame(layout)
+        if 'effect' not in self.spec:
+            return ActiveScene(self, lambda elapsed: frame, 1.0, now, layout)
+        color = parse_color_input(str(self.spec['color'])) if 'color' in self.spec else None
+        options = {k: str(v) for k, v in self.spec.get('options', {}).items()}
+        if 'fps' in self.spec:
+            options.setdefault('fps', str(self.spec['fps']))
+        effect = create_effect(self.spec['effect'], layout=layout, color=color, base=frame, options=options)
+        return ActiveScene(self, effect.render, effect.fps, now, layout, effect.close)
+
+    def check(self, layout: Layout = LAYOUT) -> None:
+        """Start the scene once and close it, so bad profiles, colors or options fail early."""
+        try:
+            self.start(0.0, layout).close()
+        except (OSError, ValueError, ImportError) as e:
+            raise ValueError(f"Schedule entry {self.label}: {e}") from e
+
+
+class ActiveScene:
+    """A started scene: renders frames relative to its own start time."""
+
+    __slots__ = ('scene', 'render', 'fps', 'started', 'close', '_table', '_rgb', '_last')
+
+    def __init__(self, scene: Scene, render: Callable, fps: float, started: float,
+                 layout: Layout = LAYOUT, close: Callable[[], None] = lambda: None):
+        self.scene = scene
+        self.render = render
+        self.fps = fps
+        self.started = started
+        self.close = close
+        brightness = scene.brightness
+        self._table = None if brightness >= 1.0 else bytes(int(i * brightness) for i in range(256))
+        self._rgb = bytearray(layout.num_leds * 3)
+        self._last = self._rgb
+
+    def rgb(self, now: float) -> bytearray:
+        """The frame for time now as RGB, brightness applied. A finished effect holds its last frame."""
+        frame = self.render(now - self.started)
+        rgb = self._rgb
+        if isinstance(frame, IndexedFrame):
+            frame.palette.expand_into(frame.indices[:len(rgb) // 3], rgb)
+        elif frame is not None:
+            n = min(len(frame), len(rgb))
+            rgb[:n] = frame if n == len(frame) else frame[:n]
+        if self._table is not None and frame is not None:
+            rgb[:] = rgb.translate(self._table)
+        return rgb
+
+    def frame(self, now: float):
+        """The frame to send at time now (the effect's own buffer when nothing needs changing)."""
+        if self._table is not None:
+            return self.rgb(now)
+        frame = self.render(now - self.started)
+        if frame is not None:
+            self._last = frame
+        return self._last
+
+
+def crossfade(outgoing, incoming, t: float, out: bytearray) -> bytearray:
+    """Blend two RGB frames into out: t = 0 is all outgoing, 1 all incoming."""
+    out[:] = bytes([a + int((b - a) * t) for a, b in zip(outgoing, incoming)])
+    return out
+
+
+class Schedule:
+    """A parsed schedule: playlist entries or time-of-day entries, plus fade settings."""
+
+    __slots__ = ('playlist', 'at', 'crossfade', 'fade_fps', 'loop')
+
+    def __init__(self, spec: dict, base_dir: Path = Path('.')):
+        self.playlist: List[Scene] = [Scene(s, base_dir) for s in spec.get('playlist', [])]
+        self.at: List[Scene] = [Scene(s, base_dir) for s in spec.get('at', [])]
+        if bool(self.playlist) == bool(self.at):
+            raise ValueError("A schedule needs either [[playlist]] or [[at]] entries (not both)")
+        for scene in self.playlist:
+            if not scene.duration or scene.duration <= 0:
+                raise ValueError(f"Playlist entry {scene.label} needs a positive duration")
+        for scene in self.at:
+            if scene.at is None:
+                raise ValueError(f"Time-of-day entry {scene.label} needs a time")
+        self.crossfade = max(0.0, float(spec.get('crossfade', 1.0)))
+        self.fade_fps = float(spec.get('fade_fps', 30.0))
+        self.loop = bool(spec.get('loop', True))
+
+
+def load_schedule(path, layout: Layout = LAYOUT) -> Schedule:
+    """Parse a schedule file and check that every scene in it can be started."""
+    path = Path(path).expanduser()
+    schedule = Schedule(parse_profile(path.read_bytes(), path.suffix), path.parent)
+    for scene in schedule.playlist + schedule.at:
+        scene.check(layout)
+    return schedule
+
+
+class ScheduleRunner:
+    """
+    Run a Schedule on a keyboard (AulaF87Pro or SimulatedKeyboard).
+
+    The heap holds (deadline, seq, scene list, index) for every upcoming
+    transition: the next playlist entry, or the next occurrence of each
+    time-of-day entry. Playlist deadlines are monotonic; time-of-day deadlines
+    are wall-clock times, compared with clock.time() every time the frame loop
+    wakes, so they stay right across suspend/resume and clock changes.
+    """
+
+    def __init__(self, keyboard, schedule: Schedule):
+        self.keyboard = keyboard
+        self.schedule = schedule
+        self.clock = keyboard.clock
+        self._now = self.clock.time if schedule.at else self.clock.monotonic
+        self._heap: list = []
+        self._seq = itertools.count()
+
+    def _push(self, deadline: float, scenes: List[Scene], index: int):
+        heapq.heappush(self._heap, (deadline, next(self._seq), scenes, index))
+
+    def _schedule_at(self, scene_index: int, now: float):
+        self._push(next_occurrence(now, self.schedule.at[scene_index].at), self.schedule.at, scene_index)
+
+    def _first_scene(self, now: float) -> Scene:
+        schedule = self.schedule
+        if schedule.playlist:
+            self._push(now + schedule.playlist[0].duration, schedule.playlist, 1)
+            return schedule.playlist[0]
+        # The active entry is the one whose last occurrence is the most recent
+        latest = max(range(len(schedule.at)), key=lambda i: last_occurrence(now, schedule.at[i].at))
+        for i in range(len(schedule.at)):
+            self._schedule_at(i, now)
+        return schedule.at[latest]
+
+    def _next_scene(self, now: float) -> Optional[Scene]:
+        """Pop every transition that is due; returns the scene to switch to (None = end)."""
+        scene = None
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, scenes, index = heapq.heappop(self._heap)
+            if scenes is self.schedule.at:
+                scene = scenes[index]
+                self._schedule_at(index, now)
+                continue
+            if index >= len(scenes):
+                if not self.schedule.loop:
+                    return None
+                index = 0
+            scene = scenes[index]
+            # After a stall (suspend, unplug), restart the timer instead of racing through entries
+            self._push(max(deadline, now) + scene.duration, scenes, index + 1)
+        return scene
+
+    def run(self, duration: float = 0.0, should_stop=None) -> bool:
+        """Run until duration (0 = forever), should_stop() or the end of a non-looping playlist."""
+        keyboard, clock, schedule_now = self.keyboard, self.clock, self._now
+        start = clock.monotonic()
+        end = start + duration if duration else None
+        self._heap.clear()
+        scene = self._first_scene(schedule_now())
+        print(f"Schedule: starting with {scene.label}")
+        active = scene.start(start, keyboard.layout)
+        fade_buf = bytearray(keyboard.num_leds * 3)
+        recorder = keyboard.recorder
+        if recorder is not None and recorder.fps is None:
+            # Scenes and fades run at different rates; record all of them at the fade rate
+            recorder.fps = self.schedule.fade_fps
+
+        def stopping() -> bool:
+            return bool(should_stop and should_stop()) or (end is not None and clock.monotonic() >= end)
+
+        try:
+            while True:
+                deadline = self._heap[0][0] if self._heap else None
+
+                def segment_over(deadline=deadline):
+                    return stopping() or (deadline is not None and schedule_now() >= deadline)
+
+                current = active
+                if not keyboard.run_frames(lambda elapsed: current.frame(clock.monotonic()),
+                                           current.fps, 0.0, segment_over):
+                    return False
+                if stopping():
+                    return True
+
+                scene = self._next_scene(schedule_now())
+                if scene is None:
+                    print("Schedule: playlist finished.")
+                    return True
+                try:
+                    incoming = scene.start(clock.monotonic(), keyboard.layout)
+                except (OSError, ValueError, ImportError) as e:
+                    # Checked when loaded, but files can change while running; keep the current scene
+                    print(f"Schedule: could not start {scene.label} ({e}); staying on {active.scene.label}")
+                    continue
+                print(f"Schedule: switching to {scene.label}")
+                fade = self.schedule.crossfade
+                if fade > 0:
+                    outgoing = active
+
+                    def blend(elapsed):
+                        now = clock.monotonic()
+                        return crossfade(outgoing.rgb(now), incoming.rgb(now), min(1.0, elapsed / fade), fade_buf)
+                    if not keyboard.run_frames(blend, max(self.schedule.fade_fps, incoming.fps), fade, stopping):
+                        active.close()
+                        active = incoming
+                        return False
+                active.close()
+                active = incoming
+        except KeyboardInterrupt:
+            print("\nSchedule: interrupted by user.")
+            raise
+        finally:
+            active.close()
+            if end is not None and clock.monotonic() >= end:
+                keyboard.turn_off()
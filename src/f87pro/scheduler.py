@@ -0,0 +1,64 @@
+import time
+from typing import Callable, Optional
+
+
+class FrameScheduler:
+    """
+    Drive a render callback at a fixed frame rate.
+
+    Frames are paced against absolute deadlines (previous + 1 / fps), so time spent
+    rendering and sending doesn't add up into drift. Sleeps are split into
+    slices of at most max_sleep seconds so should_stop() is honoured quickly
+    even at low frame rates.
+    """
+
+    __slots__ = ('fps', 'now', 'sleep', 'max_sleep', 'frames')
+
+    def __init__(self, fps: float = 20.0, now: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep, max_sleep: float = 0.1):
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        self.fps = fps
+        self.now = now
+        self.sleep = sleep
+        self.max_sleep = max_sleep
+        self.frames = 0
+
+    def run(self, render: Callable[[float], Optional[object]], send: Callable[[object], bool],
+            duration: float = 0.0, should_stop: Optional[Callable[[], bool]] = None,
+            stop_on_error: bool = True) -> bool:
+        """
+        Call render(elapsed_seconds) and send(frame) once per frame.
+        Runs until duration elapses (0.0 = forever), should_stop() returns True
+        or render returns None. Returns False if it stopped because send failed.
+        """
+        interval = 1.0 / self.fps
+        start = deadline = self.now()
+        self.frames = 0
+
+        while True:
+            if should_stop and should_stop():
+                return True
+
+            elapsed = self.now() - start
+            if duration != 0.0 and elapsed >= duration:
+                return True
+
+            frame = render(elapsed)
+            if frame is None:
+                return True
+            if not send(frame) and stop_on_error:
+                return False
+            self.frames += 1
+
+            deadline += interval
+            now = self.now()
+            if now - deadline > interval:
+                # Fell more than a frame behind; skip ahead instead of bursting
+                deadline = now
+                continue
+            while now < deadline:
+                if should_stop and should_stop():
+                    return True
+                self.sleep(min(deadline - now, self.max_sleep))
+                now = self.now()
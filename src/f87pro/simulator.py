@@ -0,0 +1,169 @@
+"""
+Headless keyboard simulator.
+
+SimulatedKeyboard behaves like AulaF87Pro but sends reports to an in-memory
+fake HID device and, by default, runs on a VirtualClock, so a 10 minute
+effect finishes as fast as it can be rendered. Renderers draw the frames it
+receives, either as an ANSI-colored keyboard in the terminal or as a PNG
+image sequence.
+"""
+import os
+import struct
+import sys
+import zlib
+from typing import Callable, Optional
+
+from .clock import VirtualClock
+from .device import AulaF87Pro, PACKET_HEADER
+from .layout import LAYOUT, Layout
+
+
+class SimulatedHID:
+    """Stand-in for hid.device that keeps the last report and passes frames on."""
+
+    __slots__ = ('on_frame', 'reports', 'last_report', 'frame_size')
+
+    def __init__(self, on_frame: Optional[Callable[[bytes], None]] = None,
+                 frame_size: int = LAYOUT.num_leds * 3):
+        self.on_frame = on_frame
+        self.reports = 0
+        self.last_report = b''
+        self.frame_size = frame_size
+
+    def open_path(self, path):
+        pass
+
+    def close(self):
+        pass
+
+    def send_feature_report(self, data) -> int:
+        self.last_report = data
+        self.reports += 1
+        if self.on_frame:
+            start = len(PACKET_HEADER)
+            self.on_frame(data[start:start + self.frame_size])
+        return len(data)
+
+
+class SimulatedKeyboard(AulaF87Pro):
+    """AulaF87Pro that never touches real hardware."""
+
+    def __init__(self, clock=None, renderers=()):
+        super().__init__(clock=clock or VirtualClock())
+        self.renderers = list(renderers)
+        self.hid = SimulatedHID(self._on_frame, self.num_leds * 3)
+
+    def _on_frame(self, frame):
+        for renderer in self.renderers:
+            renderer.draw(frame)
+
+    def connect(self, force_find: bool = False) -> bool:
+        self.device = self.hid
+        self.device_path = 'simulated'
+        self._connected = True
+        print("Connected to simulated Aula F87 Pro.")
+        return True
+
+    def disconnect(self):
+        self._connected = False
+        self.device = None
+        for renderer in self.renderers:
+            renderer.close()
+
+    @property
+    def last_frame(self) -> bytes:
+        start = len(PACKET_HEADER)
+        return bytes(self.hid.last_report[start:start + self.num_leds * 3])
+
+
+class TerminalRenderer:
+    """Draw frames as colored key blocks, redrawing in place."""
+
+    def __init__(self, stream=None, layout: Layout = LAYOUT, every: int = 1, key_width: int = 3):
+        self.stream = stream or sys.stdout
+        self.layout = layout
+        self.every = max(1, every)
+        self.frames = 0
+        # Terminal line and column of each key, fixed by the layout
+        line_of = {y: i for i, y in enumerate(sorted(set(layout.y)))}
+        self._cells = [(line_of[layout.y[slot]], int(layout.x[slot] * (key_width + 1)), led)
+                       for slot, led in enumerate(layout.leds)]
+        self._cells.sort()
+        self._lines = len(line_of)
+        self._block = '█' * key_width
+
+    def draw(self, frame):
+        self.frames += 1
+        if (self.frames - 1) % self.every:
+            return
+        out = ['\x1b[H\x1b[2J' if self.frames == 1 else f'\x1b[{self._lines}F']
+        line, col = 0, 0
+        for cell_line, cell_col, led in self._cells:
+            if cell_line != line:
+                out.append('\x1b[0m\n' * (cell_line - line))
+                line, col = cell_line, 0
+            if cell_col > col:
+                out.append(' ' * (cell_col - col))
+            r, g, b = frame[led * 3], frame[led * 3 + 1], frame[led * 3 + 2]
+            out.append(f'\x1b[38;2;{r};{g};{b}m{self._block}')
+            col = cell_col + len(self._block)
+        out.append('\x1b[0m\n')
+        self.stream.write(''.join(out))
+        self.stream.flush()
+
+    def close(self):
+        pass
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+
+def encode_png(width: int, height: int, rgb: bytes) -> bytes:
+    """Minimal 8-bit RGB PNG encoder (no filtering)."""
+    stride = width * 3
+    raw = b''.join(b'\0' + rgb[y * stride:(y + 1) * stride] for y in range(height))
+    return (b'\x89PNG\r\n\x1a\n'
+            + _png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + _png_chunk(b'IDAT', zlib.compress(raw, 6))
+            + _png_chunk(b'IEND', b''))
+
+
+class PNGRenderer:
+    """Write every Nth frame to directory/frame_000000.png, keys drawn at their physical positions."""
+
+    def __init__(self, directory: str, layout: Layout = LAYOUT, every: int = 1, scale: int = 24):
+        self.directory = directory
+        self.layout = layout
+        self.every = max(1, every)
+        self.frames = 0
+        self.written = 0
+        os.makedirs(directory, exist_ok=True)
+
+        self.width = int((layout.width + 1) * scale)
+        self.height = int((layout.height + 1) * scale)
+        key = max(1, int(scale * 0.85))
+        # Pixel spans (row start offsets and width) covered by each key
+        self._keys = []
+        for slot, led in enumerate(layout.leds):
+            px, py = int(layout.x[slot] * scale), int(layout.y[slot] * scale)
+            offsets = [((py + dy) * self.width + px) * 3 for dy in range(key)]
+            self._keys.append((led, offsets, key))
+        self._image = bytearray(self.width * self.height * 3)
+
+    def draw(self, frame):
+        self.frames += 1
+        if (self.frames - 1) % self.every:
+            return
+        image = self._image
+        for led, offsets, key in self._keys:
+            pixels = bytes(frame[led * 3:led * 3 + 3]) * key
+            for offset in offsets:
+                image[offset:offset + key * 3] = pixels
+        path = os.path.join(self.directory, f"frame_{self.written:06d}.png")
+        with open(path, 'wb') as f:
+            f.write(encode_png(self.width, self.height, bytes(image)))
+        self.written += 1
+
+    def close(self):
+        pass
@@ -0,0 +1,145 @@
+"""
+Soak testing: run an effect for hours of virtual time against the simulator
+and check that memory and CPU use per frame stay within a budget.
+
+After a warm-up period a baseline is taken; from then on, traced Python memory
+(tracemalloc, after a full garbage collection), process RSS and CPU time are
+sampled at a fixed virtual interval. A run fails if, between the baseline and
+the end, retained memory grows by more than the allowed bytes per frame, RSS
+grows by more than the allowed amount, or a frame costs more CPU than allowed.
+"""
+import gc
+import os
+import tracemalloc
+from typing import List, Optional
+
+from .clock import VirtualClock
+from .simulator import SimulatedKeyboard
+
+
+class SoakBudget:
+    __slots__ = ('alloc_per_frame', 'rss_growth', 'cpu_per_frame')
+
+    def __init__(self, alloc_per_frame: float = 1.0, rss_growth: int = 8 * 1024 * 1024,
+                 cpu_per_frame: Optional[float] = None):
+        self.alloc_per_frame = alloc_per_frame  # retained bytes per frame (tracemalloc)
+        self.rss_growth = rss_growth            # bytes
+        self.cpu_per_frame = cpu_per_frame      # seconds, or None for no limit
+
+
+class SoakSample:
+    __slots__ = ('time', 'frames', 'traced', 'rss', 'cpu')
+
+    def __init__(self, time: float, frames: int, traced: int, rss: int, cpu: float):
+        self.time = time
+        self.frames = frames
+        self.traced = traced
+        self.rss = rss
+        self.cpu = cpu
+
+
+class SoakResult:
+    __slots__ = ('samples', 'failures', 'alloc_per_frame', 'rss_growth', 'cpu_per_frame', 'top_growth')
+
+    def __init__(self, samples: List[SoakSample], budget: SoakBudget, top_growth=()):
+        self.samples = samples
+        self.top_growth = list(top_growth)
+        self.failures: List[str] = []
+        base, end = samples[0], samples[-1]
+        frames = max(1, end.frames - base.frames)
+        self.alloc_per_frame = (end.traced - base.traced) / frames
+        self.rss_growth = end.rss - base.rss
+        self.cpu_per_frame = (end.cpu - base.cpu) / frames
+
+        if self.alloc_per_frame > budget.alloc_per_frame:
+            self.failures.append(f"retained memory grew {self.alloc_per_frame:.2f} bytes/frame "
+                                 f"(budget {budget.alloc_per_frame:g})")
+        if self.rss_growth > budget.rss_growth:
+            self.failures.append(f"RSS grew {self.rss_growth / 1024:.0f} KiB "
+                                 f"(budget {budget.rss_growth / 1024:.0f} KiB)")
+        if budget.cpu_per_frame is not None and self.cpu_per_frame > budget.cpu_per_frame:
+            self.failures.append(f"CPU {self.cpu_per_frame * 1000:.3f} ms/frame "
+                                 f"(budget {budget.cpu_per_frame * 1000:.3f} ms)")
+
+    @property
+    def passed(self) -> bool:
+        return not self.failures
+
+
+def _rss_bytes() -> int:
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _cpu_seconds() -> float:
+    times = os.times()
+    return times.user + times.system
+
+
+def run_soak(effect, hours: float, budget: Optional[SoakBudget] = None,
+             sample_interval: float = 600.0, warmup: float = 60.0,
+             keyboard: Optional[SimulatedKeyboard] = None) -> SoakResult:
+    """
+    Run effect (an Effect instance) for the given number of virtual hours and
+    return a SoakResult. Samples are taken every sample_interval virtual seconds
+    after warmup seconds.
+    """
+    budget = budget or SoakBudget()
+    keyboard = keyboard or SimulatedKeyboard(clock=VirtualClock())
+    keyboard.connect()
+    clock = keyboard.clock
+    start = clock.monotonic()
+    samples: List[SoakSample] = []
+    snapshots = []
+    next_sample = start + warmup
+
+    def sample():
+        # A full collection also empties CPython's freelists, which fill up to
+        # a fixed size and would otherwise look like slow growth
+        gc.collect()
+        samples.append(SoakSample(clock.monotonic() - start, keyboard.hid.reports,
+                                  tracemalloc.get_traced_memory()[0], _rss_bytes(), _cpu_seconds()))
+
+    def should_stop():
+        nonlocal next_sample
+        if clock.monotonic() >= next_sample:
+            sample()
+            if not snapshots:
+                snapshots.append(tracemalloc.take_snapshot())
+            next_sample += sample_interval
+        return False
+
+    tracemalloc.start()
+    try:
+        keyboard.run_frames(effect.render, effect.fps, hours * 3600.0, should_stop)
+        sample()
+        top_growth = []
+        if snapshots:
+            top_growth = tracemalloc.take_snapshot().compare_to(snapshots[0], 'lineno')[:5]
+    finally:
+        tracemalloc.stop()
+        keyboard.disconnect()
+
+    return SoakResult(samples, budget, top_growth)
+
+
+def print_soak_report(result: SoakResult):
+    print(f"{'time':>10} {'frames':>10} {'traced KiB':>11} {'RSS KiB':>10} {'CPU s':>8}")
+    for s in result.samples:
+        print(f"{s.time:>9.0f}s {s.frames:>10} {s.traced / 1024:>11.1f} {s.rss / 1024:>10.0f} {s.cpu:>8.2f}")
+    print(f"Retained memory: {result.alloc_per_frame:.3f} bytes/frame, "
+          f"RSS growth: {result.rss_growth / 1024:.0f} KiB, "
+          f"CPU: {result.cpu_per_frame * 1000:.3f} ms/frame")
+    if result.passed:
+        print("Soak test passed.")
+        return
+    print("Soak test FAILED:")
+    for failure in result.failures:
+        print(f"  {failure}")
+    if result.top_growth:
+        print("Largest allocation growth since baseline:")
+        for stat in result.top_growth:
+            print(f"  {stat}")
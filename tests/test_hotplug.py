@@ -0,0 +1,119 @@
+import queue
+import time
+
+import pytest
+
+from f87pro import device as device_module
+from f87pro.clock import VirtualClock
+from f87pro.device import AulaF87Pro
+
+DEVPATH = '/devices/pci0000:00/0000:00:14.0/usb1/1-2/1-2:1.1/0003:258A:010C.0005/hidraw/{}'
+
+
+class FakeHID:
+    """hid.device stand-in: opening always works, writes fail while 'failing' is set."""
+
+    opened = []
+    failing = False
+
+    def __init__(self):
+        self.reports = []
+        self.closed = False
+
+    def open_path(self, path):
+        FakeHID.opened.append(path)
+
+    def send_feature_report(self, data):
+        if FakeHID.failing:
+            raise OSError("write error")
+        self.reports.append(bytes(data))
+        return len(data)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def keyboard(monkeypatch, tmp_path):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setattr(device_module.hid, 'device', FakeHID)
+    FakeHID.opened = []
+    FakeHID.failing = False
+    kb = AulaF87Pro(clock=VirtualClock())
+    kb.device = FakeHID()
+    kb.device_path = '/dev/hidraw4'
+    kb._connected = True
+    yield kb
+    kb.disconnect()
+
+
+def queued_events(events: queue.Queue):
+    def source(stop):
+        while not stop.is_set():
+            try:
+                yield events.get(timeout=0.02)
+            except queue.Empty:
+                continue
+    return source
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_failed_writes_back_off(keyboard, capsys):
+    FakeHID.failing = True
+    reopened_at = []
+    reopen = keyboard._reopen
+
+    def timed_reopen():
+        reopened_at.append(keyboard.clock.monotonic())
+        return reopen()
+    keyboard._reopen = timed_reopen
+
+    frame = bytes(keyboard.num_leds * 3)
+    keyboard.run_frames(lambda elapsed: frame, 20.0, 10.0, stop_on_error=False)
+
+    # Each failed write doubles the delay before the next reopen, up to the maximum;
+    # retries happen on the first frame after the delay (frames are 0.05 s apart)
+    gaps = [b - a for a, b in zip(reopened_at, reopened_at[1:])]
+    assert len(reopened_at) < 12  # not one reopen per frame (200 frames)
+    for i, gap in enumerate(gaps):
+        delay = min(AulaF87Pro.RECONNECT_MIN_DELAY * 2 ** (i + 1), AulaF87Pro.RECONNECT_MAX_DELAY)
+        assert delay - 1e-6 <= gap <= delay + 0.05 + 1e-6
+    assert capsys.readouterr().out.count("Reconnecting") == 1
+
+    # Once writes succeed again, the backoff is reset and every frame goes out
+    FakeHID.failing = False
+    keyboard.run_frames(lambda elapsed: frame, 20.0, 5.0, stop_on_error=False)
+    assert "Reconnected" in capsys.readouterr().out
+    assert keyboard._retry_delay == 0.0
+    assert len(keyboard.device.reports) >= 5.0 * 20 - keyboard.RECONNECT_MAX_DELAY * 20 - 1
+
+
+def test_unplug_and_replug_through_event_source(keyboard):
+    events = queue.Queue()
+    assert keyboard.enable_hotplug(event_source=queued_events(events))
+    assert keyboard.send_rgb(bytes([255, 0, 0]) * keyboard.num_leds)
+    old_device = keyboard.device
+
+    events.put({'ACTION': 'remove', 'SUBSYSTEM': 'hidraw', 'DEVNAME': 'hidraw4',
+                'DEVPATH': DEVPATH.format('hidraw4')})
+    wait_for(lambda: not keyboard._plugged.is_set())
+    assert old_device.closed and keyboard.device is None
+    assert not keyboard.send_rgb(bytes(keyboard.num_leds * 3))  # dropped while unplugged
+
+    # Another interface's node doesn't count
+    events.put({'ACTION': 'add', 'SUBSYSTEM': 'hidraw', 'DEVNAME': 'hidraw5',
+                'DEVPATH': DEVPATH.format('hidraw5').replace(':1.1/', ':1.0/')})
+    events.put({'ACTION': 'add', 'SUBSYSTEM': 'hidraw', 'DEVNAME': 'hidraw7',
+                'DEVPATH': DEVPATH.format('hidraw7')})
+    wait_for(keyboard._plugged.is_set)
+    assert keyboard.device_path == '/dev/hidraw7'
+    assert FakeHID.opened == [b'/dev/hidraw7']
+    # The last frame sent (the all-off one dropped while unplugged) is restored right away
+    assert keyboard.device.reports == [bytes(keyboard._packet)]
+    assert keyboard.config_manager.get('device_path') == '/dev/hidraw7'
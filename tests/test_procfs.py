@@ -0,0 +1,61 @@
+import pytest
+
+from f87pro.procfs import CpuLoad, MemoryPressure, NetThroughput
+
+# Only the fields the readers use matter; the rest mirror the real layout
+STAT = """cpu  {agg} 0 0 0 0 0
+cpu0 {cpu0} 0 0 0 0 0
+cpu1 {cpu1} 0 0 0 0 0
+intr 12345 {intr}
+ctxt 98765
+"""
+
+NET_DEV = """Inter-|   Receive                                                |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed
+    lo: {lo} 10 0 0 0 0 0 0 {lo} 10 0 0 0 0 0 0
+  eth0: {rx} 20 0 0 0 0 0 0 {tx} 30 0 0 0 0 0 0
+ wlan0: {wrx} 1 0 0 0 0 0 0 0 1 0 0 0 0 0 0
+"""
+
+
+def write_stat(root, cpu0, cpu1):
+    # user nice system idle iowait; rewritten in place so the open descriptor sees it
+    fields = lambda user, idle: f"{user} 0 0 {idle} 0"
+    (root / 'stat').write_text(STAT.format(agg=fields(cpu0[0] + cpu1[0], cpu0[1] + cpu1[1]),
+                                           cpu0=fields(*cpu0), cpu1=fields(*cpu1),
+                                           intr=' '.join(['0'] * 2000)))
+
+
+def test_cpu_load_is_the_busy_share_since_the_last_sample(tmp_path):
+    write_stat(tmp_path, cpu0=(100, 900), cpu1=(500, 500))
+    cpu = CpuLoad(str(tmp_path))
+    assert cpu.loads == [0.0, 0.0]
+
+    write_stat(tmp_path, cpu0=(175, 925), cpu1=(500, 600))  # cpu0 75% busy, cpu1 idle
+    assert cpu.sample() == pytest.approx([0.75, 0.0])
+
+    write_stat(tmp_path, cpu0=(175, 925), cpu1=(600, 600))  # no time passed on cpu0
+    assert cpu.sample() == pytest.approx([0.0, 1.0])
+    cpu.close()
+
+
+def test_memory_pressure(tmp_path):
+    meminfo = tmp_path / 'meminfo'
+    meminfo.write_text("MemTotal:       16000000 kB\nMemFree:  1000 kB\nMemAvailable:    4000000 kB\n")
+    memory = MemoryPressure(str(tmp_path))
+    assert memory.sample() == pytest.approx(0.75)
+    meminfo.write_text("MemTotal:       16000000 kB\nMemFree:  1000 kB\nMemAvailable:   12000000 kB\n")
+    assert memory.sample() == pytest.approx(0.25)
+    memory.close()
+
+
+def test_net_throughput_skips_loopback(tmp_path):
+    net = tmp_path / 'net'
+    net.mkdir()
+    (net / 'dev').write_text(NET_DEV.format(lo=5000, rx=1000, tx=2000, wrx=0))
+    throughput = NetThroughput(str(tmp_path))
+    assert throughput.sample(10.0) == 0.0  # no previous sample time yet
+
+    (net / 'dev').write_text(NET_DEV.format(lo=999999, rx=3000, tx=4000, wrx=1000))
+    assert throughput.sample(12.0) == pytest.approx((2000 + 2000 + 1000) / 2.0)
+    throughput.close()